@@ -0,0 +1,209 @@
+"""
+Amortization schedules: remaining balance, interest/principal split and equity over time
+Supports annuity loans (fixed payment) and serial loans (fixed principal), rate
+changes and extra payments. Horizon queries use closed-form formulas (O(1) per
+loan); full schedules are produced lazily, a block of months at a time, for many
+loans at once. All functions broadcast over NumPy arrays of loans.
+
+Conventions: months are 1-based. A rate change at month m applies from month m's
+interest onwards. An extra payment at month m is paid together with month m's
+payment. After either, the payment is recalculated over the remaining term.
+"""
+
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+ANNUITY = 'annuity'
+SERIAL = 'serial'
+
+
+def _check_kind(kind: str):
+    if kind not in (ANNUITY, SERIAL):
+        raise ValueError(f"Unknown loan kind {kind!r}; use '{ANNUITY}' or '{SERIAL}'")
+
+
+def _annuity_factor(monthly_rate, months) -> np.ndarray:
+    """Payment per krone of balance for an annuity over `months` months (1/months at 0%)"""
+    monthly_rate = np.asarray(monthly_rate, dtype=np.float64)
+    months = np.asarray(months, dtype=np.float64)
+    growth = (1 + monthly_rate) ** months
+    zero_rate = (monthly_rate == 0) | (growth == 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(zero_rate, 1 / months, monthly_rate * growth / (growth - 1))
+
+
+def _balance_after(balance, monthly_rate, payment, months) -> np.ndarray:
+    """Annuity balance after `months` fixed payments (closed form)"""
+    growth = (1 + monthly_rate) ** months
+    with np.errstate(divide='ignore', invalid='ignore'):
+        paid = np.where(monthly_rate == 0, payment * months, payment * (growth - 1) / monthly_rate)
+    return balance * growth - paid
+
+
+def monthly_payment(principal, annual_rate, years, kind: str = ANNUITY) -> np.ndarray:
+    """First month's payment (for annuity loans the payment every month)"""
+    _check_kind(kind)
+    principal = np.asarray(principal, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    months = np.asarray(years) * 12
+    if kind == ANNUITY:
+        return principal * _annuity_factor(monthly_rate, months)
+    return principal / months + principal * monthly_rate
+
+
+def remaining_balance(principal, annual_rate, years, month, kind: str = ANNUITY) -> np.ndarray:
+    """Balance after `month` payments, without building the schedule"""
+    _check_kind(kind)
+    principal = np.asarray(principal, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    months = np.asarray(years) * 12
+    month = np.minimum(np.asarray(month), months)
+    if kind == ANNUITY:
+        payment = principal * _annuity_factor(monthly_rate, months)
+        balance = _balance_after(principal, monthly_rate, payment, month)
+    else:
+        balance = principal * (1 - month / months)
+    return np.where(month >= months, 0.0, balance)
+
+
+def interest_paid(principal, annual_rate, years, month, kind: str = ANNUITY) -> np.ndarray:
+    """Total interest paid over the first `month` months (closed form)"""
+    _check_kind(kind)
+    principal = np.asarray(principal, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    months = np.asarray(years) * 12
+    month = np.minimum(np.asarray(month), months)
+    if kind == ANNUITY:
+        payment = principal * _annuity_factor(monthly_rate, months)
+        return month * payment - (principal - remaining_balance(principal, annual_rate, years, month, kind))
+    # Serial: interest on a balance falling by principal / months each month
+    return monthly_rate * principal * (month - month * (month - 1) / (2 * months))
+
+
+def equity_built(principal, annual_rate, years, month, kind: str = ANNUITY) -> np.ndarray:
+    """Principal repaid after `month` months (equity built through repayments)"""
+    return np.asarray(principal, dtype=np.float64) - remaining_balance(principal, annual_rate, years, month, kind)
+
+
+def _per_loan(value, num_loans: int) -> np.ndarray:
+    """Scalar or per-loan array as a float array of shape (loans,)"""
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (num_loans,)).copy()
+
+
+def iter_schedules(
+    principal,
+    annual_rate,
+    years,
+    kind: str = ANNUITY,
+    rate_changes: Optional[Dict[int, object]] = None,
+    extra_payments: Optional[Dict[int, object]] = None,
+    block_months: int = 12,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Month-by-month schedules for many loans, generated lazily in blocks of months
+    principal, annual_rate, years: Scalars or arrays (one value per loan)
+    rate_changes: {month: new annual rate (scalar or per loan)}
+    extra_payments: {month: extra amount (scalar or per loan)}
+    Yields dicts with 'month' (block_len,) and 'payment', 'interest', 'principal',
+    'balance' of shape (loans, block_len). Loans that are paid off show zeros.
+    """
+    _check_kind(kind)
+    rate_changes = rate_changes or {}
+    extra_payments = extra_payments or {}
+
+    num_loans = np.broadcast(np.asarray(principal), np.asarray(annual_rate), np.asarray(years)).size
+    balance = _per_loan(principal, num_loans)
+    monthly_rate = _per_loan(annual_rate, num_loans) / 12
+    term = np.broadcast_to(np.asarray(years) * 12, (num_loans,)).astype(np.int64)
+    last_month = int(term.max())
+
+    # Segments between events: a rate change starts a segment at its month,
+    # an extra payment ends a segment at its month
+    boundaries = sorted({m for m in rate_changes if 1 <= m <= last_month}
+                        | {m + 1 for m in extra_payments if 1 <= m < last_month})
+    starts = [1] + [m for m in boundaries if m > 1]
+    ends = [s - 1 for s in starts[1:]] + [last_month]
+
+    for start, end in zip(starts, ends):
+        if start in rate_changes:
+            monthly_rate = _per_loan(rate_changes[start], num_loans) / 12
+
+        # Re-amortize over the months left at the start of the segment
+        remaining = np.maximum(term - (start - 1), 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if kind == ANNUITY:
+                payment = np.where(remaining > 0, balance * _annuity_factor(monthly_rate, remaining), 0.0)
+            else:
+                installment = np.where(remaining > 0, balance / remaining, 0.0)
+        segment_balance = balance
+
+        for block_start in range(start, end + 1, block_months):
+            block_end = min(block_start + block_months - 1, end)
+            months = np.arange(block_start, block_end + 1)
+            offset = (months - start + 1)[None, :]           # payments made in this segment
+            active = offset <= remaining[:, None]
+
+            rate = monthly_rate[:, None]
+            if kind == ANNUITY:
+                before = _balance_after(segment_balance[:, None], rate, payment[:, None], offset - 1)
+                after = _balance_after(segment_balance[:, None], rate, payment[:, None], offset)
+                block_payment = np.broadcast_to(payment[:, None], after.shape).copy()
+            else:
+                before = segment_balance[:, None] - (offset - 1) * installment[:, None]
+                after = segment_balance[:, None] - offset * installment[:, None]
+                block_payment = installment[:, None] + rate * before
+            interest = rate * before
+
+            # The last payment of a loan clears it exactly
+            after = np.where(offset == remaining[:, None], 0.0, after)
+            block = {
+                'month': months,
+                'payment': np.where(active, block_payment, 0.0),
+                'interest': np.where(active, interest, 0.0),
+                'principal': np.where(active, block_payment - interest, 0.0),
+                'balance': np.where(active, np.maximum(after, 0.0), 0.0),
+            }
+
+            if block_end == end and end in extra_payments:
+                extra = np.minimum(_per_loan(extra_payments[end], num_loans), block['balance'][:, -1])
+                block['payment'][:, -1] += extra
+                block['principal'][:, -1] += extra
+                block['balance'][:, -1] -= extra
+
+            yield block
+
+        balance = block['balance'][:, -1].copy()
+
+
+def amortization_schedule(
+    principal: float,
+    annual_rate: float,
+    years: int,
+    kind: str = ANNUITY,
+    rate_changes: Optional[Dict[int, float]] = None,
+    extra_payments: Optional[Dict[int, float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Full schedule for a single loan as 1-D arrays (month, payment, interest, principal, balance)"""
+    blocks = list(iter_schedules(principal, annual_rate, years, kind, rate_changes, extra_payments,
+                                 block_months=int(years * 12)))
+    return {
+        'month': np.concatenate([b['month'] for b in blocks]),
+        **{field: np.concatenate([b[field][0] for b in blocks])
+           for field in ('payment', 'interest', 'principal', 'balance')},
+    }
+
+
+if __name__ == "__main__":
+    # Example values: your loan share from loan_calculator's example
+    loan = 2_062_500
+    schedule = amortization_schedule(loan, 0.05, 30)
+    serial = amortization_schedule(loan, 0.05, 30, kind=SERIAL)
+
+    print("=== Nedbetaling (annuitet vs. serie) ===\n")
+    for year in (1, 5, 10, 20, 30):
+        month = year * 12
+        print(f"Etter {year:>2} år: restgjeld {schedule['balance'][month - 1]:>12,.0f} / "
+              f"{serial['balance'][month - 1]:>12,.0f} kr   "
+              f"betalt renter {schedule['interest'][:month].sum():>12,.0f} / "
+              f"{serial['interest'][:month].sum():>12,.0f} kr")
@@ -0,0 +1,294 @@
+"""
+asyncio pipeline for scraping ad pages
+Stages run concurrently, joined by bounded queues (a full queue makes the stage
+before it wait, so memory stays bounded):
+
+    search discovery -> ad fetch -> parse -> price history -> loan -> sink
+
+Fetches go through per-host limits (concurrent requests and minimum interval),
+the one place where politeness towards finn.no is configured. HTTP requests and
+the browser fallback run in an I/O thread pool, HTML parsing in its own executor
+(threads by default, processes with parse_in_processes=True). Fetch, parse and
+price history times go into a RunProfile, the scraper's when it is passed in.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+from finn_extract import (new_property_data, apply_definition_list, apply_body_text, apply_sections,
+                          missing_fields)
+from loan_calculator import calculate_loan_for_listing
+from price_history import attach_price_history
+from run_profile import RunProfile
+
+# (max concurrent requests, minimum seconds between requests) per host
+DEFAULT_HOST_LIMIT = (2, 1.0)
+
+_DONE = object()
+
+
+class HostLimiter:
+    def __init__(self, concurrency: int, min_interval: float):
+        """At most `concurrency` requests in flight and one start every min_interval seconds"""
+        self.min_interval = min_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+
+
+def extract_ad_page(url: str, page_html: bytes) -> Dict:
+    """Parse an ad page and apply the three extraction strategies (runs in the parse executor)"""
+    from finn_scraper_http import parse_ad_page
+
+    property_data = new_property_data(url)
+    pairs, body_text, section_texts = parse_ad_page(page_html)
+    apply_definition_list(property_data, pairs)
+    apply_body_text(property_data, body_text)
+    apply_sections(property_data, section_texts)
+    return property_data
+
+
+class AsyncPipeline:
+    def __init__(self, loan_params: dict = None, lookup: Callable[[Dict], Optional[Dict]] = None,
+                 fallback=None, fetch_workers: int = 4, parse_workers: int = 2,
+                 parse_in_processes: bool = False, host_limits: Dict[str, Tuple[int, float]] = None,
+                 default_host_limit: Tuple[int, float] = DEFAULT_HOST_LIMIT, queue_size: int = 16,
+                 timeout: float = 10.0, browser_lock: threading.Lock = None, profile: RunProfile = None):
+        """
+        loan_params: LOAN_PARAMS-style dict; adds 'loan_calculation' to each listing
+        lookup: Returns already known data for a card (e.g. ListingCache), skipping its ad page
+        fallback: Scraper (e.g. FinnPropertyScraperSelenium) for blocked or incomplete pages
+        fetch_workers: Fetch tasks (the host limits decide how many requests actually run at once)
+        parse_workers: Size of the parse executor
+        host_limits: {host: (max concurrent requests, min seconds between requests)}
+        default_host_limit: Limit for hosts not in host_limits
+        queue_size: Capacity of each queue between stages
+        browser_lock: Held while the browser is used (shared with discovery when it uses the same browser)
+        profile: Where stage timings are recorded (e.g. the scraper's profile)
+        """
+        self.loan_params = loan_params
+        self.lookup = lookup
+        self.fallback = fallback
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.parse_in_processes = parse_in_processes
+        self.host_limits = host_limits or {}
+        self.default_host_limit = default_host_limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.browser_lock = browser_lock or threading.Lock()
+        self.profile = profile or RunProfile()
+        self.stats = {'discovered': 0, 'cached': 0, 'fetched': 0, 'fallbacks': 0, 'errors': 0, 'finished': 0}
+        self._limiters: Dict[str, HostLimiter] = {}
+
+    def _limiter(self, url: str) -> HostLimiter:
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = HostLimiter(*self.host_limits.get(host, self.default_host_limit))
+        return self._limiters[host]
+
+    def _browser_scrape(self, url: str) -> Dict:
+        with self.browser_lock:
+            return self.fallback.scrape_property(url)
+
+    def _get(self, url: str):
+        with self.profile.phase('http_get'):
+            return self.session.get(url, timeout=self.timeout)
+
+    async def _use_fallback(self, property_data: Dict, reason: str):
+        """(data, needs_history): scrape with the browser, which also records price history"""
+        if self.fallback is None:
+            print(f"  WARNING: {reason}")
+            property_data['error'] = reason
+            self.stats['errors'] += 1
+            return property_data, True
+        print(f"  {reason} - using browser for {property_data['url']}")
+        self.stats['fallbacks'] += 1
+        self.profile.count('browser_fallbacks')
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, self._browser_scrape, property_data['url']), False
+
+    async def _discover(self, cards: Iterable[Dict], fetch_queue: asyncio.Queue, loan_queue: asyncio.Queue):
+        """Stage 1: pull cards (search pages load in a thread) and route them"""
+        loop = asyncio.get_running_loop()
+        cards = iter(cards)
+
+        def next_card():
+            with self.browser_lock:
+                return next(cards, _DONE)
+
+        while True:
+            card = await loop.run_in_executor(self._io_executor, next_card)
+            if card is _DONE:
+                break
+            self.stats['discovered'] += 1
+            data = self.lookup(card) if self.lookup else None
+            if data is not None:
+                self.stats['cached'] += 1
+                await loan_queue.put((card, data))
+            else:
+                await fetch_queue.put(card)
+
+        for _ in range(self.fetch_workers):
+            await fetch_queue.put(_DONE)
+
+    async def _fetch(self, fetch_queue: asyncio.Queue, parse_queue: asyncio.Queue):
+        """Stage 2: download ad pages within the host limits"""
+        loop = asyncio.get_running_loop()
+        while True:
+            card = await fetch_queue.get()
+            if card is _DONE:
+                await parse_queue.put(_DONE)
+                return
+            url = card['url']
+            print(f"Fetching {url}")
+            async with self._limiter(url):
+                try:
+                    response = await loop.run_in_executor(self._io_executor, self._get, url)
+                    reason = None
+                except Exception as e:
+                    response, reason = None, f'Request failed: {e}'
+            self.stats['fetched'] += 1
+
+            # Check if we got blocked or redirected
+            if response is not None:
+                if 'blocked' in response.url.lower() or response.url != url:
+                    reason = f'Redirected to {response.url}'
+                    self.profile.count('blocked_redirects')
+                elif response.status_code != 200:
+                    reason = f'HTTP {response.status_code}'
+            await parse_queue.put((card, response.content if reason is None else None, reason))
+
+    async def _parse(self, parse_queue: asyncio.Queue, history_queue: asyncio.Queue):
+        """Stage 3: extract fields in the parse executor; browser fallback for bad pages"""
+        loop = asyncio.get_running_loop()
+        remaining = self.fetch_workers
+        pending = set()
+
+        async def handle(card, content, reason):
+            property_data = new_property_data(card['url'])
+            needs_history = True
+            if reason is None:
+                # No queueing inside the executor: at most parse_workers pages are handled at once
+                with self.profile.phase('ad_parse'):
+                    property_data = await loop.run_in_executor(self._parse_executor, extract_ad_page,
+                                                               card['url'], content)
+                # Only critical missing data (not felleskostnad) sends us to the browser
+                critical_missing = [m for m in missing_fields(property_data) if m != 'felleskostnad']
+                if critical_missing:
+                    reason = f"Missing {', '.join(critical_missing)}"
+            if reason is not None:
+                property_data, needs_history = await self._use_fallback(property_data, reason)
+            await history_queue.put((card, property_data, needs_history))
+
+        while remaining:
+            item = await parse_queue.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            # Bounded: at most parse_workers pages in flight
+            if len(pending) >= self.parse_workers:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(asyncio.ensure_future(handle(*item)))
+
+        if pending:
+            for task in (await asyncio.wait(pending))[0]:
+                task.result()
+        await history_queue.put(_DONE)
+
+    def _attach_price_history(self, property_data: Dict) -> Dict:
+        with self.profile.phase('price_history'):
+            return attach_price_history(property_data)
+
+    async def _history(self, history_queue: asyncio.Queue, loan_queue: asyncio.Queue):
+        """Stage 4: record prices (file I/O in a thread, one listing at a time)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await history_queue.get()
+            if item is _DONE:
+                await loan_queue.put(_DONE)
+                return
+            card, property_data, needs_history = item
+            if needs_history:
+                await loop.run_in_executor(self._io_executor, self._attach_price_history, property_data)
+            await loan_queue.put((card, property_data))
+
+    async def _loan(self, loan_queue: asyncio.Queue, sink: Callable[[Dict, Dict], None]):
+        """Stages 5 and 6: calculate the loan and hand the listing to the sink"""
+        while True:
+            item = await loan_queue.get()
+            if item is _DONE:
+                return
+            card, property_data = item
+            if self.loan_params:
+                loan_result = calculate_loan_for_listing(property_data, self.loan_params)
+                if loan_result:
+                    property_data['loan_calculation'] = loan_result
+            self.stats['finished'] += 1
+            sink(card, property_data)
+
+    async def run_async(self, cards: Iterable[Dict], sink: Callable[[Dict, Dict], None]) -> Dict:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from finn_scraper_http import USER_AGENT
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.fetch_workers, pool_maxsize=self.fetch_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'nb-NO,nb;q=0.9,no;q=0.8,en;q=0.6',
+        })
+        # Discovery + fetches + history + browser fallback
+        self._io_executor = ThreadPoolExecutor(max_workers=self.fetch_workers + 3)
+        executor_class = ProcessPoolExecutor if self.parse_in_processes else ThreadPoolExecutor
+        self._parse_executor = executor_class(max_workers=self.parse_workers)
+
+        fetch_queue = asyncio.Queue(self.queue_size)
+        parse_queue = asyncio.Queue(self.queue_size)
+        history_queue = asyncio.Queue(self.queue_size)
+        # Cached listings join here too, so the loan queue is the only one with two producers
+        loan_queue = asyncio.Queue(self.queue_size)
+
+        # The loan stage ends on the history stage's _DONE; discovery must be finished by then,
+        # because the history stage only ends after every fetch worker has
+        tasks = [
+            asyncio.ensure_future(self._discover(cards, fetch_queue, loan_queue)),
+            *(asyncio.ensure_future(self._fetch(fetch_queue, parse_queue)) for _ in range(self.fetch_workers)),
+            asyncio.ensure_future(self._parse(parse_queue, history_queue)),
+            asyncio.ensure_future(self._history(history_queue, loan_queue)),
+            asyncio.ensure_future(self._loan(loan_queue, sink)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._io_executor.shutdown(wait=True, cancel_futures=True)
+            self._parse_executor.shutdown(wait=True, cancel_futures=True)
+            self.session.close()
+        return self.stats
+
+    def run(self, cards: Iterable[Dict], sink: Callable[[Dict, Dict], None]) -> Dict:
+        """
+        Scrape the cards and call sink(card, data) for every finished listing (in completion order)
+        Returns counters: discovered, cached, fetched, fallbacks, errors, finished
+        """
+        return asyncio.run(self.run_async(cards, sink))
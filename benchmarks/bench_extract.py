@@ -0,0 +1,192 @@
+"""
+Benchmark: rule-table field extraction vs. the previous per-field regex strategies
+Runs both over a corpus of ad texts, checks that they produce identical fields,
+then times each strategy. The corpus is the saved texts in
+benchmarks/fixtures/ad_texts.json plus fixture ad pages parsed with lxml, each
+also without its definition list (so the body text strategy does the work) and
+with only its sections, and randomly shuffled copies of all body texts.
+
+Usage: python benchmarks/bench_extract.py [--pages N] [--repeat N]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from finn_extract import (new_property_data, apply_definition_list, apply_body_text,  # noqa: E402
+                          apply_sections)
+from finn_scraper_http import parse_ad_page  # noqa: E402
+from fixture_server import FIXTURES_DIR, FixtureSite, make_listings  # noqa: E402
+
+AD_TEXTS_FILE = FIXTURES_DIR / 'ad_texts.json'
+URL = 'https://www.finn.no/realestate/homes/ad.html?finnkode=123456789'
+
+
+# The strategies as they were before the rule table, kept as the reference
+def legacy_extract_price(text: str) -> int:
+    if not text:
+        return None
+    numbers = re.findall(r'\d+', text.replace(' ', ''))
+    if numbers:
+        return int(''.join(numbers))
+    return None
+
+
+def legacy_extract_number(text: str) -> int:
+    if not text:
+        return None
+    numbers = re.findall(r'\d+', text)
+    if numbers:
+        return int(numbers[0])
+    return None
+
+
+def legacy_extract_eieform(text: str) -> str:
+    if not text:
+        return None
+    text_lower = text.lower().strip()
+    if 'selveier' in text_lower:
+        return 'Selveier'
+    elif 'aksje' in text_lower:
+        return 'Aksje'
+    elif 'andel' in text_lower:
+        return 'Andel'
+    return None
+
+
+def legacy_definition_list(property_data: Dict, pairs):
+    for label, value in pairs:
+        label = label.lower().strip()
+        value = value.strip()
+        if 'totalpris' in label:
+            property_data['totalpris_inkl_fellesgjeld'] = legacy_extract_price(value)
+        elif 'soverom' in label:
+            property_data['antall_soverom'] = legacy_extract_number(value)
+        elif 'felleskost' in label or 'fellesutgifter' in label:
+            property_data['felleskostnad'] = legacy_extract_price(value)
+        elif 'eieform' in label:
+            property_data['eieform'] = legacy_extract_eieform(value)
+
+
+def legacy_body_text(property_data: Dict, body_text: str):
+    totalpris_match = re.search(r'Totalpris.*?(\d[\d\s]+)', body_text)
+    if totalpris_match and not property_data['totalpris_inkl_fellesgjeld']:
+        property_data['totalpris_inkl_fellesgjeld'] = legacy_extract_price(totalpris_match.group(1))
+    soverom_match = re.search(r'(\d+)\s*soverom', body_text, re.IGNORECASE)
+    if soverom_match and not property_data['antall_soverom']:
+        property_data['antall_soverom'] = int(soverom_match.group(1))
+    felles_match = re.search(r'Felleskost(?:nad|/mnd\.).*?(\d[\d\s]+)', body_text)
+    if felles_match and not property_data['felleskostnad']:
+        property_data['felleskostnad'] = legacy_extract_price(felles_match.group(1))
+    eieform_match = re.search(r'Eieform[:\s]*(Selveier|Aksje|Andel)', body_text, re.IGNORECASE)
+    if eieform_match and not property_data['eieform']:
+        property_data['eieform'] = legacy_extract_eieform(eieform_match.group(1))
+
+
+def legacy_sections(property_data: Dict, section_texts):
+    for text in section_texts:
+        if 'Totalpris' in text and not property_data['totalpris_inkl_fellesgjeld']:
+            property_data['totalpris_inkl_fellesgjeld'] = legacy_extract_price(text)
+        if 'soverom' in text.lower() and not property_data['antall_soverom']:
+            property_data['antall_soverom'] = legacy_extract_number(text)
+        if 'Felleskostnad' in text and not property_data['felleskostnad']:
+            property_data['felleskostnad'] = legacy_extract_price(text)
+
+
+def legacy_extract(page: Dict) -> Dict:
+    property_data = new_property_data(URL)
+    legacy_definition_list(property_data, page['pairs'])
+    legacy_body_text(property_data, page['body'])
+    legacy_sections(property_data, page['sections'])
+    return property_data
+
+
+def table_extract(page: Dict) -> Dict:
+    property_data = new_property_data(URL)
+    apply_definition_list(property_data, page['pairs'])
+    apply_body_text(property_data, page['body'])
+    apply_sections(property_data, page['sections'])
+    return property_data
+
+
+def build_corpus(pages: int, seed: int = 0) -> Dict[str, List[Dict]]:
+    """Ad texts grouped by which strategy has to find the fields"""
+    with open(AD_TEXTS_FILE, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+
+    site = FixtureSite(make_listings(pages, seed))
+    parsed = []
+    for listing in site.listings:
+        pairs, body, sections = parse_ad_page(site.render_ad(listing))
+        parsed.append({'pairs': pairs, 'body': body, 'sections': sections})
+
+    rng = random.Random(seed)
+    shuffled = []
+    for page in saved + parsed:
+        lines = page['body'].split('\n')
+        rng.shuffle(lines)
+        shuffled.append({'pairs': [], 'body': '\n'.join(lines), 'sections': page['sections']})
+
+    return {
+        'saved': saved,
+        'definition_list': parsed,
+        'body_text': [{**page, 'pairs': []} for page in parsed] + shuffled,
+        'sections': [{**page, 'pairs': [], 'body': ''} for page in parsed],
+    }
+
+
+def check_parity(corpus: Dict[str, List[Dict]]) -> int:
+    """Number of pages where the two implementations disagree (printed)"""
+    mismatches = 0
+    for group, pages in corpus.items():
+        for i, page in enumerate(pages):
+            expected, actual = legacy_extract(page), table_extract(page)
+            if expected != actual:
+                mismatches += 1
+                print(f"  MISMATCH {group}[{i}] {page.get('name', '')}: {expected} != {actual}")
+    return mismatches
+
+
+def time_per_page(fn: Callable, pages: List[Dict], repeat: int) -> float:
+    """Best of `repeat` runs over all pages, in microseconds per page"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--pages', type=int, default=300, help='Fixture ad pages in the corpus')
+    parser.add_argument('--repeat', type=int, default=20, help='Timing runs (best is reported)')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.pages)
+    total = sum(len(pages) for pages in corpus.values())
+    print(f"Corpus: {total} ad texts ({', '.join(f'{group} {len(pages)}' for group, pages in corpus.items())})")
+
+    mismatches = check_parity(corpus)
+    print(f"Parity: {total - mismatches}/{total} identical\n")
+
+    print(f"{'Corpus':<18} {'legacy µs/page':>15} {'rule table µs/page':>19} {'speedup':>8}")
+    for group, pages in corpus.items():
+        legacy = time_per_page(legacy_extract, pages, args.repeat)
+        table = time_per_page(table_extract, pages, args.repeat)
+        print(f"{group:<18} {legacy:>15.1f} {table:>19.1f} {legacy / table:>7.2f}x")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: scalar calculate_loan loop vs. vectorized calculate_loan_batch
+Checks that both give identical results, then times 1e5, 1e6 and 1e7 rows.
+The scalar loop is timed on 1e5 rows and scaled up for the larger sizes.
+
+Usage: python benchmarks/bench_loan_batch.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loan_calculator import calculate_loan  # noqa: E402
+from loan_batch import calculate_loan_batch  # noqa: E402
+
+SIZES = [100_000, 1_000_000, 10_000_000]
+SCALAR_SAMPLE = 100_000
+
+
+def make_listings(n: int, seed: int = 0) -> dict:
+    """Random listings and loan parameters, including zero-rate rows"""
+    rng = np.random.default_rng(seed)
+    return {
+        'property_price': rng.integers(1_500_000, 9_000_000, n).astype(np.float64),
+        'down_payment': rng.choice([300_000.0, 500_000.0, 800_000.0], n),
+        'loan_term_years': rng.choice([20, 25, 30], n),
+        'annual_interest_rate': rng.choice([0.0, 0.045, 0.0508, 0.06], n),
+        'num_bedrooms': rng.integers(1, 6, n),
+        'num_co_owners': rng.integers(1, 4, n),
+        'rent_per_room': rng.choice([5_000.0, 6_000.0, 6_500.0], n),
+        'total_common_costs': rng.integers(0, 8_000, n).astype(np.float64),
+        'annual_appreciation_rate': rng.choice([0.02, 0.03, 0.036], n),
+        'eieform': rng.choice(['Selveier', 'Aksje', 'Andel'], n),
+    }
+
+
+def scalar_loop(listings: dict, n: int) -> list:
+    """calculate_loan once per row, the way scrape_all does it"""
+    columns = {key: values[:n].tolist() for key, values in listings.items()}
+    return [calculate_loan(**{key: columns[key][i] for key in columns}) for i in range(n)]
+
+
+def check_exact(listings: dict, n: int = 20_000):
+    """Assert the batch results equal the scalar results bit for bit"""
+    batch = calculate_loan_batch(**{key: values[:n] for key, values in listings.items()})
+    for i, expected in enumerate(scalar_loop(listings, n)):
+        for field, value in expected.items():
+            if batch[field][i] != value:
+                raise AssertionError(f"Row {i} {field}: batch {batch[field][i]!r} != scalar {value!r}")
+    print(f"Exactness check passed on {n:,} rows")
+
+
+def main():
+    listings = make_listings(max(SIZES))
+    check_exact(listings)
+
+    start = time.perf_counter()
+    scalar_loop(listings, SCALAR_SAMPLE)
+    scalar_per_row = (time.perf_counter() - start) / SCALAR_SAMPLE
+
+    print(f"\n{'rows':>12} {'scalar (s)':>12} {'batch (s)':>12} {'speedup':>10}")
+    for n in SIZES:
+        columns = {key: values[:n] for key, values in listings.items()}
+        start = time.perf_counter()
+        calculate_loan_batch(**columns)
+        batch_seconds = time.perf_counter() - start
+        scalar_seconds = scalar_per_row * n
+        estimated = '' if n <= SCALAR_SAMPLE else '*'
+        print(f"{n:>12,} {scalar_seconds:>11.2f}{estimated or ' '} {batch_seconds:>12.3f} "
+              f"{scalar_seconds / batch_seconds:>9.0f}x")
+    print("\n* scalar time extrapolated from the 1e5-row run")
+
+
+if __name__ == "__main__":
+    main()
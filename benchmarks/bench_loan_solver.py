@@ -0,0 +1,148 @@
+"""
+Benchmark: closed-form loan_solver vs. bisection on the scalar calculate_loan
+Checks that the batch solvers agree with bisection (and that calculate_loan at the
+solved price or down payment lands on the budget), then times affordability
+tables of 1e3, 1e5 and 1e6 scenarios. Bisection is timed on a sample and
+scaled up.
+
+Usage: python benchmarks/bench_loan_solver.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loan_calculator import calculate_loan  # noqa: E402
+from loan_solver import (BUDGET_TARGETS, EIEFORMS, max_affordable_price_batch,  # noqa: E402
+                         required_down_payment_batch)
+
+SIZES = [1_000, 100_000, 1_000_000]
+BISECTION_SAMPLE = 1_000
+MAX_PRICE = 1e12
+
+
+def make_scenarios(n: int, seed: int = 0) -> dict:
+    """Random budgets and loan setups, including zero-rate rows and every eieform"""
+    rng = np.random.default_rng(seed)
+    return {
+        'monthly_budget': rng.integers(-2_000, 25_000, n).astype(np.float64),
+        'property_price': rng.integers(1_500_000, 9_000_000, n).astype(np.float64),
+        'down_payment': rng.choice([0.0, 300_000.0, 800_000.0], n),
+        'loan_term_years': rng.choice([20, 25, 30], n),
+        'annual_interest_rate': rng.choice([0.0, 0.045, 0.0508, 0.06], n),
+        'num_bedrooms': rng.integers(1, 7, n),
+        'num_co_owners': rng.integers(1, 4, n),
+        'rent_per_room': rng.choice([0.0, 5_000.0, 6_500.0], n),
+        'total_common_costs': rng.integers(0, 8_000, n).astype(np.float64),
+        'annual_appreciation_rate': rng.choice([0.02, 0.03, 0.036], n),
+        'eieform': rng.choice(EIEFORMS, n),
+    }
+
+
+def _row(scenarios: dict, i: int) -> dict:
+    return {key: values[i].item() for key, values in scenarios.items()}
+
+
+def _cost(row: dict, target: str, **override) -> float:
+    args = {key: value for key, value in row.items() if key != 'monthly_budget'}
+    return calculate_loan(**{**args, **override})[target]
+
+
+def bisect_price(row: dict, target: str, iterations: int = 80) -> float:
+    """Highest price within budget by bisection on calculate_loan (nan if none, inf if unbounded)"""
+    budget = row['monthly_budget']
+    if _cost(row, target, property_price=MAX_PRICE) <= budget:
+        return np.inf
+    if _cost(row, target, property_price=0.0) > budget:
+        return np.nan
+    low, high = 0.0, MAX_PRICE
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        if _cost(row, target, property_price=mid) > budget:
+            high = mid
+        else:
+            low = mid
+    return low
+
+
+def bisect_down_payment(row: dict, target: str, iterations: int = 80) -> float:
+    """Lowest down payment within budget by bisection (0 if none needed, nan if impossible)"""
+    budget = row['monthly_budget']
+    share = calculate_loan(**{**{k: v for k, v in row.items() if k != 'monthly_budget'},
+                              'down_payment': 0.0})['your_loan_share']
+    if _cost(row, target, down_payment=share) > budget:
+        return np.nan
+    if _cost(row, target, down_payment=0.0) <= budget:
+        return 0.0
+    low, high = 0.0, share
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        if _cost(row, target, down_payment=mid) > budget:
+            low = mid
+        else:
+            high = mid
+    return high
+
+
+def solve(scenarios: dict, target: str):
+    prices = max_affordable_price_batch(**{k: v for k, v in scenarios.items() if k != 'property_price'},
+                                        target=target)
+    down_payments = required_down_payment_batch(**{k: v for k, v in scenarios.items() if k != 'down_payment'},
+                                                target=target)
+    return prices, down_payments
+
+
+def check_against_bisection(scenarios: dict, n: int = 2_000):
+    """Assert the closed form agrees with bisection and lands exactly on the budget"""
+    sample = {key: values[:n] for key, values in scenarios.items()}
+    worst = 0.0
+    for target in BUDGET_TARGETS:
+        prices, down_payments = solve(sample, target)
+        for i in range(n):
+            row = _row(sample, i)
+            for name, solved, expected, field in (('price', prices[i], bisect_price(row, target), 'property_price'),
+                                                  ('down payment', down_payments[i],
+                                                   bisect_down_payment(row, target), 'down_payment')):
+                if np.isfinite(expected) != np.isfinite(solved) or np.isnan(expected) != np.isnan(solved):
+                    raise AssertionError(f"Row {i} {target} {name}: solved {solved!r}, bisection {expected!r}")
+                if not np.isfinite(solved):
+                    continue
+                if abs(solved - expected) > max(1e-3, 1e-9 * abs(expected)):
+                    raise AssertionError(f"Row {i} {target} {name}: solved {solved!r}, bisection {expected!r}")
+                if solved > 0:
+                    worst = max(worst, abs(_cost(row, target, **{field: float(solved)}) - row['monthly_budget']))
+    print(f"Bisection check passed on {n:,} scenarios x {len(BUDGET_TARGETS)} targets "
+          f"(largest budget miss {worst:.2e} kr)")
+
+
+def main():
+    scenarios = make_scenarios(max(SIZES))
+    check_against_bisection(scenarios)
+
+    sample = {key: values[:BISECTION_SAMPLE] for key, values in scenarios.items()}
+    start = time.perf_counter()
+    for i in range(BISECTION_SAMPLE):
+        row = _row(sample, i)
+        bisect_price(row, 'net_monthly_cost')
+        bisect_down_payment(row, 'net_monthly_cost')
+    bisection_per_row = (time.perf_counter() - start) / BISECTION_SAMPLE
+
+    print(f"\n{'scenarios':>12} {'bisection (s)':>14} {'solver (ms)':>12} {'speedup':>10}")
+    for n in SIZES:
+        columns = {key: values[:n] for key, values in scenarios.items()}
+        start = time.perf_counter()
+        solve(columns, 'net_monthly_cost')
+        solver_seconds = time.perf_counter() - start
+        bisection_seconds = bisection_per_row * n
+        estimated = '' if n <= BISECTION_SAMPLE else '*'
+        print(f"{n:>12,} {bisection_seconds:>13.2f}{estimated or ' '} {solver_seconds * 1e3:>12.1f} "
+              f"{bisection_seconds / solver_seconds:>9.0f}x")
+    print(f"\n* bisection time extrapolated from the {BISECTION_SAMPLE:,}-scenario run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Benchmark: scraper and per-listing work against recorded fixtures on a local server
+Runs get_property_listings, scrape_property (normal, consent overlay and blocked
+ads) and scrape_all against benchmarks/fixture_server.py, plus micro-benchmarks
+of calculate_loan and update_price_history. Reports throughput, latency
+percentiles and peak Python memory (tracemalloc), saves the results to
+benchmarks/results/ and compares them with the previous run.
+
+Browser benchmarks need Selenium and Chrome; without them only the HTTP scraper
+and micro-benchmarks run. Price history is written to a temporary directory.
+
+Usage: python benchmarks/bench_scraper.py [--listings N] [--latency-ms MS] [--no-browser]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import price_history  # noqa: E402
+from loan_calculator import calculate_loan  # noqa: E402
+from run_profile import percentile  # noqa: E402
+from fixture_server import FixtureServer, make_listings  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+SEARCH_PATH = '/realestate/homes/search.html?sort=PRICE_ASC'
+LOAN_PARAMS = {
+    'down_payment': 500_000,
+    'loan_term_years': 30,
+    'annual_interest_rate': 0.05,
+    'num_co_owners': 2,
+    'rent_per_room': 6_000,
+    'annual_appreciation_rate': 0.03,
+}
+
+
+def measure(fn: Callable, items: Iterable, trace_memory: bool = True) -> Dict:
+    """
+    Call fn(item) for every item; latency per call, throughput and peak memory.
+    Output printed by the scrapers is discarded.
+    """
+    items = list(items)
+    latencies = []
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for item in items:
+                call_start = time.perf_counter()
+                fn(item)
+                latencies.append(time.perf_counter() - call_start)
+            seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'items': len(items),
+        'seconds': seconds,
+        'throughput_per_s': len(items) / seconds if seconds else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_mb': peak / 1e6 if peak is not None else None,
+    }
+
+
+def measure_cpu(fn: Callable, items: Iterable) -> Dict:
+    """measure() for CPU-bound work: time without tracemalloc, then a second pass for memory"""
+    items = list(items)
+    result = measure(fn, items, trace_memory=False)
+    result['peak_mb'] = measure(fn, items)['peak_mb']
+    return result
+
+
+def bench_calculate_loan(listings: List[Dict], repeat: int) -> Dict:
+    rows = [listing for listing in listings if listing['bedrooms']] * repeat
+
+    def run(listing):
+        calculate_loan(
+            property_price=listing['total'],
+            num_bedrooms=listing['bedrooms'],
+            total_common_costs=listing['common'],
+            eieform=listing['eieform'],
+            **LOAN_PARAMS,
+        )
+
+    return measure_cpu(run, rows)
+
+
+def bench_update_price_history(listings: List[Dict], repeat: int) -> Dict:
+    updates = []
+    for round_number in range(repeat):
+        for listing in listings:
+            url = f"https://www.finn.no/realestate/homes/ad.html?finnkode={listing['finnkode']}"
+            # Every third listing changes price each round
+            price = listing['total'] - (round_number * 10_000 if listing['area'] % 3 == 0 else 0)
+            updates.append((url, price))
+    return measure_cpu(lambda update: price_history.update_price_history(*update), updates)
+
+
+def bench_http_scrape_property(server: FixtureServer, listings: List[Dict], kind: str) -> Dict:
+    from finn_scraper_http import FinnPropertyScraperHTTP
+
+    scraper = FinnPropertyScraperHTTP(fallback_factory=None)
+    try:
+        urls = [server.ad_url(listing) for listing in listings if listing['kind'] == kind]
+        return measure(scraper.scrape_property, urls)
+    finally:
+        scraper.close()
+
+
+def bench_browser(server: FixtureServer, listings: List[Dict], results: Dict):
+    """Selenium benchmarks; skipped with a message when no browser can be started"""
+    try:
+        from finn_scraper_selenium import FinnPropertyScraperSelenium
+        scraper = FinnPropertyScraperSelenium(headless=True)
+    except Exception as e:
+        print(f"Skipping browser benchmarks: {e.__class__.__name__}: {e}")
+        return
+
+    search_url = server.url(SEARCH_PATH)
+    try:
+        result = measure(lambda url: scraper.get_property_listings(search_url=url), [search_url])
+        result['throughput_per_s'] = len(listings) / result['seconds']
+        results['selenium get_property_listings'] = result
+
+        for kind in ('normal', 'consent', 'blocked'):
+            urls = [server.ad_url(listing) for listing in listings if listing['kind'] == kind]
+            results[f'selenium scrape_property ({kind})'] = measure(scraper.scrape_property, urls)
+    finally:
+        scraper.close()
+
+    for engine in ('selenium', 'http'):
+        # Browser start-up is not part of the scrape
+        scraper = FinnPropertyScraperSelenium(headless=True)
+        try:
+            result = measure(lambda url: scraper.scrape_all(search_url=url, loan_params=LOAN_PARAMS, engine=engine,
+                                                            close_browser=False),
+                             [search_url])
+        finally:
+            scraper.close()
+        result['throughput_per_s'] = len(listings) / result['seconds']
+        results[f'scrape_all (engine={engine})'] = result
+
+
+def previous_results(exclude: Path) -> Dict:
+    """Results of the most recent earlier run, if any"""
+    runs = sorted(path for path in RESULTS_DIR.glob('bench_scraper_*.json') if path != exclude)
+    if not runs:
+        return {}
+    return json.loads(runs[-1].read_text(encoding='utf-8'))['results']
+
+
+def print_results(results: Dict, previous: Dict):
+    print(f"\n{'benchmark':<40} {'items/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>8} {'vs last':>8}")
+    for name, result in results.items():
+        change = ''
+        if name in previous and previous[name]['throughput_per_s']:
+            change = f"{result['throughput_per_s'] / previous[name]['throughput_per_s'] - 1:+.0%}"
+        print(f"{name:<40} {result['throughput_per_s']:>10,.1f} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['peak_mb']:>8.2f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--listings', type=int, default=120, help='Listings served by the fixture server')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated network latency per request')
+    parser.add_argument('--no-browser', action='store_true', help='Skip the Selenium benchmarks')
+    args = parser.parse_args()
+
+    listings = make_listings(args.listings)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the real price history out of the benchmark
+        price_history.PRICE_HISTORY_FILE = Path(tmp) / 'price_history.json'
+
+        results['calculate_loan'] = bench_calculate_loan(listings, repeat=max(1, 100_000 // len(listings)))
+        results['update_price_history'] = bench_update_price_history(listings, repeat=20)
+
+        with FixtureServer(listings, latency=args.latency_ms / 1000) as server:
+            for kind in ('normal', 'consent', 'blocked'):
+                results[f'http scrape_property ({kind})'] = bench_http_scrape_property(server, listings, kind)
+            if not args.no_browser:
+                bench_browser(server, listings, results)
+
+        price_history.get_price_history_store().close()
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"bench_scraper_{datetime.now():%Y%m%d_%H%M%S}.json"
+    run = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'listings': args.listings,
+        'latency_ms': args.latency_ms,
+        'results': results,
+    }
+    path.write_text(json.dumps(run, indent=2), encoding='utf-8')
+
+    print_results(results, previous_results(exclude=path))
+    print(f"\nResults saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Local stand-in for finn.no, serving recorded search and ad page fixtures
+Pages are rendered from the HTML templates in benchmarks/fixtures with
+deterministic listing data, so benchmarks never touch the live site.
+
+Routes:
+  /realestate/homes/search.html?page=N[&sort=PRICE_ASC]  search result pages
+  /realestate/homes/ad.html?finnkode=X                   ad pages
+  /consent-iframe.html                                   consent dialog (iframe)
+  /blocked                                               block page
+
+Ad pages come in three kinds: 'normal', 'consent' (cookie consent overlay with
+an iframe, as on finn.no) and 'blocked' (302 redirect to /blocked).
+
+Usage: python benchmarks/fixture_server.py [port]   (serves until Ctrl+C)
+"""
+
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+PAGE_SIZE = 50
+CONSENT_EVERY = 10   # Every 10th ad shows the consent overlay
+BLOCKED_EVERY = 25   # Every 25th ad redirects to the block page
+
+STREETS = ['Innherredsveien', 'Elgeseter gate', 'Kongens gate', 'Møllenberg', 'Byåsveien', 'Lademoen',
+           'Singsakerbakken', 'Tiller', 'Nardoveien', 'Kolstad']
+
+
+def _load(name: str) -> Template:
+    return Template((FIXTURES_DIR / name).read_text(encoding='utf-8'))
+
+
+def format_kr(amount: int) -> str:
+    """Amount with spaces as thousands separators, as finn.no shows it"""
+    return f"{amount:,}".replace(',', ' ')
+
+
+def make_listings(n: int, seed: int = 0) -> List[Dict]:
+    """Deterministic listing data for the fixtures"""
+    rng = random.Random(seed)
+    listings = []
+    for i in range(n):
+        asking = rng.randrange(1_800_000, 7_500_000, 25_000)
+        debt = rng.choice([0, 0, 0, rng.randrange(50_000, 900_000, 5_000)])
+        if (i + 1) % BLOCKED_EVERY == 0:
+            kind = 'blocked'
+        elif (i + 1) % CONSENT_EVERY == 0:
+            kind = 'consent'
+        else:
+            kind = 'normal'
+        listings.append({
+            'finnkode': str(310_000_000 + i * 7919),
+            'kind': kind,
+            'title': f"{rng.randint(1, 5)}-roms leilighet",
+            'address': f"{rng.choice(STREETS)} {rng.randint(1, 120)}, Trondheim",
+            'asking': asking,
+            'debt': debt,
+            'total': asking + debt,
+            'common': rng.randrange(1_500, 7_000, 50),
+            'costs': int(asking * 0.025),
+            'eieform': 'Aksje' if debt else rng.choice(['Selveier', 'Selveier', 'Andel']),
+            'bedrooms': rng.randint(1, 5),
+            'area': rng.randint(35, 140),
+            'floor': rng.randint(1, 6),
+            'year': rng.randint(1900, 2022),
+        })
+    return listings
+
+
+class FixtureSite:
+    def __init__(self, listings: List[Dict], latency: float = 0.0):
+        """
+        Rendered fixture pages for a set of listings
+        latency: Seconds to sleep before every response (simulated network time)
+        """
+        self.listings = listings
+        self.by_finnkode = {listing['finnkode']: listing for listing in listings}
+        self.latency = latency
+        self.search_page = _load('search_page.html')
+        self.search_card = _load('search_card.html')
+        self.ad_page = _load('ad_page.html')
+        self.consent_overlay = (FIXTURES_DIR / 'consent_overlay.html').read_text(encoding='utf-8')
+        self.consent_iframe = (FIXTURES_DIR / 'consent_iframe.html').read_bytes()
+        self.blocked = (FIXTURES_DIR / 'blocked.html').read_bytes()
+
+    def _amounts(self, listing: Dict) -> Dict:
+        return {key: format_kr(listing[key]) if key in ('asking', 'debt', 'total', 'common', 'costs') else value
+                for key, value in listing.items()}
+
+    def render_search(self, page: int, sort: str) -> bytes:
+        listings = self.listings
+        if sort == 'PRICE_ASC':
+            listings = sorted(listings, key=lambda listing: listing['total'])
+        start = (page - 1) * PAGE_SIZE
+        cards = ''.join(self.search_card.substitute(self._amounts(listing))
+                        for listing in listings[start:start + PAGE_SIZE])
+        pages = -(-len(listings) // PAGE_SIZE)
+        pagination = ' '.join(f'<a href="?page={p}">{p}</a>' for p in range(1, pages + 1))
+        return self.search_page.substitute(
+            page=page, sort=sort, consent=self.consent_overlay if page == 1 else '',
+            total_hits=len(listings), cards=cards, pagination=pagination,
+        ).encode('utf-8')
+
+    def render_ad(self, listing: Dict) -> bytes:
+        consent = self.consent_overlay if listing['kind'] == 'consent' else ''
+        return self.ad_page.substitute(self._amounts(listing), consent=consent).encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    site: FixtureSite = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b'', headers: Dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.site.latency:
+            time.sleep(self.site.latency)
+        parts = urlsplit(self.path)
+        query = dict(parse_qsl(parts.query))
+
+        if parts.path == '/realestate/homes/search.html':
+            self._send(200, self.site.render_search(int(query.get('page', 1)), query.get('sort', '')))
+        elif parts.path == '/realestate/homes/ad.html':
+            listing = self.site.by_finnkode.get(query.get('finnkode'))
+            if listing is None:
+                self._send(404, b'<html><body><h1>Fant ikke annonsen</h1></body></html>')
+            elif listing['kind'] == 'blocked':
+                self._send(302, headers={'Location': '/blocked'})
+            else:
+                self._send(200, self.site.render_ad(listing))
+        elif parts.path == '/consent-iframe.html':
+            self._send(200, self.site.consent_iframe)
+        elif parts.path == '/blocked':
+            self._send(200, self.site.blocked)
+        else:
+            self._send(404, b'')
+
+
+class FixtureServer:
+    def __init__(self, listings: List[Dict], port: int = 0, latency: float = 0.0):
+        """
+        Serve fixture pages from a background thread (port 0 = any free port)
+        """
+        handler = type('FixtureHandler', (_Handler,), {'site': FixtureSite(listings, latency)})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def ad_url(self, listing: Dict) -> str:
+        return self.url(f"/realestate/homes/ad.html?finnkode={listing['finnkode']}")
+
+    def start(self) -> 'FixtureServer':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server = FixtureServer(make_listings(120), port=port)
+    print(f"Serving fixtures on {server.url('/realestate/homes/search.html?sort=PRICE_ASC')}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,116 @@
+"""
+Cached ChromeDriver resolution
+ChromeDriverManager().install() checks for (and sometimes downloads) a driver on
+every call, which costs seconds per browser. The resolved driver path is saved
+together with the Chrome and driver versions, and reused as long as the driver
+still exists and matches the installed Chrome's major version.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+DRIVER_CACHE_FILE = Path(__file__).parent / "chromedriver_cache.json"
+
+# Where to look for the Chrome version, per platform
+CHROME_BINARIES = [
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+]
+CHROME_REGISTRY_KEY = r'HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon'
+
+
+def _run_version(command) -> Optional[str]:
+    """First x.y.z.w version number printed by a command, or None"""
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'(\d+(?:\.\d+)+)', output)
+    return match.group(1) if match else None
+
+
+def chrome_version() -> Optional[str]:
+    """Installed Chrome/Chromium version, or None if it cannot be found"""
+    if sys.platform == 'win32':
+        return _run_version(['reg', 'query', CHROME_REGISTRY_KEY, '/v', 'version'])
+    for binary in CHROME_BINARIES:
+        version = _run_version([binary, '--version'])
+        if version:
+            return version
+    return None
+
+
+def driver_version(path: str) -> Optional[str]:
+    """Version of a chromedriver binary, or None if it does not run"""
+    return _run_version([path, '--version'])
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    return version.split('.')[0] if version else None
+
+
+def _load_cache(path: Path) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def invalidate_driver_cache(path: Path = DRIVER_CACHE_FILE):
+    """Forget the cached driver (e.g. after it failed to start a session)"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def resolve_chromedriver(path: Path = DRIVER_CACHE_FILE) -> str:
+    """
+    Path to a chromedriver matching the installed Chrome, installing one only when needed
+    path: Cache file for the resolved driver
+    """
+    cached = _load_cache(path)
+    browser = chrome_version()
+    driver_path = cached.get('driver_path')
+
+    if driver_path and os.path.exists(driver_path):
+        # Same Chrome as when the driver was resolved, and the driver still runs
+        same_browser = browser is None or _major(browser) == _major(cached.get('chrome_version'))
+        if not same_browser:
+            print(f"Chrome changed ({cached.get('chrome_version')} -> {browser}), updating ChromeDriver")
+        else:
+            current = driver_version(driver_path)
+            if _major(current) == _major(cached.get('driver_version')):
+                return driver_path
+            print(f"ChromeDriver changed ({cached.get('driver_version')} -> {current or 'does not run'}), "
+                  f"updating ChromeDriver")
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    driver_path = ChromeDriverManager().install()
+    cache = {
+        'driver_path': driver_path,
+        'driver_version': driver_version(driver_path),
+        'chrome_version': browser,
+    }
+    # Atomic write; browsers of parallel workers may resolve the driver at the same time
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not save ChromeDriver cache: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return driver_path
@@ -0,0 +1,241 @@
+"""
+Field extraction for finn.no search and ad pages, shared by the Selenium and HTTP scrapers
+Works on plain data (URLs, definition-list pairs, page text, section texts) so it does
+not depend on how the page was fetched. Which labels, patterns and section markers
+find each field is declared once in FIELD_RULES.
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+def extract_finnkode(url: str) -> Optional[str]:
+    """Extract finnkode (property ID) from URL"""
+    match = re.search(r'finnkode=(\d+)', url)
+    if match:
+        return match.group(1)
+    return None
+
+
+def is_property_ad_url(href: str) -> bool:
+    """True for links to single property ads (not projects or planned properties)"""
+    if not href or not ('/realestate/homes/ad.html' in href or '/ad.html?finnkode=' in href):
+        return False
+    # Skip project listings (multiple apartments) and planned properties
+    if '/realestate/project/' in href or '/realestate/projectsingle/' in href or '/realestate/planned/' in href:
+        return False
+    return True
+
+
+def search_page_url(search_url: str, page: int) -> str:
+    """Search URL for result page number `page` (1 = first page)"""
+    parts = urlsplit(search_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != 'page']
+    if page > 1:
+        query.append(('page', str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def is_sorted_by_price(search_url: str) -> bool:
+    """True if search results are sorted by price, lowest first"""
+    return dict(parse_qsl(urlsplit(search_url).query)).get('sort') == 'PRICE_ASC'
+
+
+def extract_card_price(text: str) -> Optional[int]:
+    """
+    Highest kr amount on a search result card.
+    Cards show the asking price and sometimes totalpris/felleskost, all of which
+    are at most the totalpris, so this is a lower bound for the listing's totalpris.
+    """
+    if not text:
+        return None
+    amounts = re.findall(r'(\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)\s*kr', text)
+    if not amounts:
+        return None
+    return max(extract_price(amount) for amount in amounts)
+
+
+def extract_card_bedrooms(text: str) -> Optional[int]:
+    """Bedroom count shown on a search result card ("3 soverom" / "3 sov."), if any"""
+    if not text:
+        return None
+    match = re.search(r'(\d+)\s*(?:soverom|sov\b)', text, re.IGNORECASE)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def parse_search_card(href: str, card_text: str) -> Dict:
+    """Structured data from a search result card"""
+    return {
+        'url': href,
+        'finnkode': extract_finnkode(href) or "unknown",
+        'card_price': extract_card_price(card_text),
+        'card_bedrooms': extract_card_bedrooms(card_text),
+    }
+
+
+def filter_listing_cards(cards: Iterable[Dict], max_price: int = None,
+                         min_bedrooms: int = None) -> Iterator[Dict]:
+    """
+    Drop listings we can rule out from the search card alone, before any ad page is opened.
+    Card prices never exceed the totalpris, so a card over max_price is always over budget.
+    Cards without a price or bedroom count are kept and checked on the ad page.
+    """
+    for card in cards:
+        reason = card_skip_reason(card, max_price=max_price, min_bedrooms=min_bedrooms)
+        if reason:
+            print(f"  Skipping {card['finnkode']}: {reason}")
+            continue
+        yield card
+
+
+def card_skip_reason(card: Dict, max_price: int = None, min_bedrooms: int = None) -> Optional[str]:
+    """Why filter_listing_cards would drop this card, or None if it is kept"""
+    if max_price and card['card_price'] and card['card_price'] > max_price:
+        return f"card price {card['card_price']:,} kr > {max_price:,} kr"
+    if min_bedrooms and card['card_bedrooms'] is not None and card['card_bedrooms'] < min_bedrooms:
+        return f"{card['card_bedrooms']} soverom < {min_bedrooms}"
+    return None
+
+
+_DIGITS = re.compile(r'\d+')
+_NON_DIGITS = re.compile(r'\D+')
+
+
+def extract_price(text: str) -> int:
+    """Extract price from text (removes spaces, 'kr', etc.)"""
+    if not text:
+        return None
+    # Keep the digits only
+    digits = _NON_DIGITS.sub('', text)
+    if digits:
+        return int(digits)
+    return None
+
+
+def extract_number(text: str) -> int:
+    """Extract a single number from text"""
+    if not text:
+        return None
+    match = _DIGITS.search(text)
+    if match:
+        return int(match.group())
+    return None
+
+
+def extract_eieform(text: str) -> str:
+    """Extract and normalize eieform (ownership type)"""
+    if not text:
+        return None
+    text_lower = text.lower().strip()
+    if 'selveier' in text_lower:
+        return 'Selveier'
+    elif 'aksje' in text_lower:
+        return 'Aksje'
+    elif 'andel' in text_lower:
+        return 'Andel'
+    return None
+
+
+class FieldRule(NamedTuple):
+    """How one field is found by the three extraction strategies"""
+    field: str
+    # Strategy 1: definition-list label (lowercase) contains one of these; value parsed by `value`
+    labels: Tuple[str, ...]
+    value: Callable[[str], Any]
+    # Strategy 2: regex on the body text, group 1 parsed by `match_value` (None = not searched)
+    pattern: Optional[str] = None
+    match_value: Callable[[str], Any] = None
+    # Strategy 3: section text containing `section` is parsed whole by `section_value` (None = not used)
+    section: Optional[str] = None
+    section_ignore_case: bool = False
+    section_value: Callable[[str], Any] = None
+
+
+# One row per field, in priority order (the first label match wins in strategy 1).
+# A new field needs a row here and a key in new_property_data.
+FIELD_RULES: Tuple[FieldRule, ...] = (
+    FieldRule('totalpris_inkl_fellesgjeld', labels=('totalpris',), value=extract_price,
+              pattern=r'Totalpris.*?(\d[\d\s]+)', match_value=extract_price,
+              section='Totalpris', section_value=extract_price),
+    FieldRule('antall_soverom', labels=('soverom',), value=extract_number,
+              pattern=r'(?i:(\d+)\s*soverom)', match_value=int,
+              section='soverom', section_ignore_case=True, section_value=extract_number),
+    FieldRule('felleskostnad', labels=('felleskost', 'fellesutgifter'), value=extract_price,
+              pattern=r'Felleskost(?:nad|/mnd\.).*?(\d[\d\s]+)', match_value=extract_price,
+              section='Felleskostnad', section_value=extract_price),
+    FieldRule('eieform', labels=('eieform',), value=extract_eieform,
+              pattern=r'(?i:Eieform[:\s]*(Selveier|Aksje|Andel))', match_value=extract_eieform),
+)
+
+# Compiled once at import
+_LABEL_RULES = tuple((keyword, rule) for rule in FIELD_RULES for keyword in rule.labels)
+_BODY_RULES = tuple((rule, re.compile(rule.pattern)) for rule in FIELD_RULES if rule.pattern)
+_SECTION_RULES = tuple(rule for rule in FIELD_RULES if rule.section)
+
+
+def new_property_data(url: str) -> Dict:
+    """Empty result dict for a listing"""
+    return {
+        'url': url,
+        'finnkode': extract_finnkode(url) or "unknown",
+        'totalpris_inkl_fellesgjeld': None,
+        'antall_soverom': None,
+        'felleskostnad': None,
+        'eieform': None  # selveier, aksje, or andel
+    }
+
+
+def apply_definition_list(property_data: Dict, pairs: Iterable[Tuple[str, str]]):
+    """Strategy 1: Fill fields from dl/dt/dd (label, value) pairs"""
+    for label, value in pairs:
+        label = label.lower().strip()
+        for keyword, rule in _LABEL_RULES:
+            if keyword in label:
+                property_data[rule.field] = rule.value(value.strip())
+                break
+
+
+def apply_body_text(property_data: Dict, body_text: str):
+    """Strategy 2: Search through all visible text on the page (only for fields still missing)"""
+    for rule, pattern in _BODY_RULES:
+        if property_data[rule.field]:
+            continue
+        match = pattern.search(body_text)
+        if match:
+            property_data[rule.field] = rule.match_value(match.group(1))
+
+
+def apply_sections(property_data: Dict, section_texts: Iterable[str]):
+    """Strategy 3: Fill remaining fields from info/data/details sections"""
+    for text in section_texts:
+        text_lower = None
+        remaining = 0
+        for rule in _SECTION_RULES:
+            if property_data[rule.field]:
+                continue
+            remaining += 1
+            if rule.section_ignore_case:
+                if text_lower is None:
+                    text_lower = text.lower()
+                found = rule.section in text_lower
+            else:
+                found = rule.section in text
+            if found:
+                property_data[rule.field] = rule.section_value(text)
+        if not remaining:
+            break
+
+
+def missing_fields(property_data: Dict) -> List[str]:
+    """Names of the fields we did not find (felleskostnad is not critical)"""
+    missing = []
+    if not property_data['totalpris_inkl_fellesgjeld']:
+        missing.append('totalpris')
+    if not property_data['antall_soverom']:
+        missing.append('soverom')
+    if not property_data['felleskostnad']:
+        missing.append('felleskostnad')
+    return missing
@@ -0,0 +1,186 @@
+"""
+HTTP-only fast path for finn.no ad pages using requests + lxml
+Ad pages are server-rendered, so the fields can be read from the HTML without a
+browser. Falls back to the Selenium scraper when a page is blocked or incomplete.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+
+from finn_extract import (new_property_data, apply_definition_list, apply_body_text, apply_sections,
+                          missing_fields)
+from price_history import attach_price_history
+from rate_control import AdaptiveRateController
+from run_profile import RunProfile
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Same selector as Strategy 3 in the Selenium scraper
+SECTION_XPATH = "//*[contains(@class, 'info') or contains(@class, 'data') or contains(@class, 'details')]"
+
+# Elements the browser lays out on their own line / never renders
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul',
+}
+CELL_TAGS = {'td', 'th'}
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'svg'}
+
+
+def _collect_text(element, parts: List[str], include_tail: bool):
+    """Append the text of element roughly the way a browser would lay it out"""
+    tag = element.tag.lower() if isinstance(element.tag, str) else None  # comments have no str tag
+    if tag is not None and tag not in SKIP_TAGS and element.get('hidden') is None:
+        separator = '\n' if tag in BLOCK_TAGS else ' ' if tag in CELL_TAGS else ''
+        parts.append(separator)
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            _collect_text(child, parts, include_tail=True)
+        parts.append(separator)
+    if include_tail and element.tail:
+        parts.append(element.tail)
+
+
+def visible_text(element) -> str:
+    """Approximation of Selenium's element.text for a parsed lxml element"""
+    parts = []
+    _collect_text(element, parts, include_tail=False)
+    lines = (re.sub(r'[ \t\r\f\v\xa0]+', ' ', line).strip() for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def parse_ad_page(page_html: bytes) -> Tuple[List[Tuple[str, str]], str, List[str]]:
+    """
+    Parse an ad page into the inputs of the three extraction strategies:
+    (dt, dd) text pairs, body text and info/data/details section texts
+    """
+    doc = lxml_html.fromstring(page_html)
+
+    pairs = []
+    for dl in doc.iter('dl'):
+        dts = [visible_text(dt) for dt in dl.iter('dt')]
+        dds = [visible_text(dd) for dd in dl.iter('dd')]
+        pairs.extend(zip(dts, dds))
+
+    body = doc.find('body')
+    body_text = visible_text(body if body is not None else doc)
+
+    section_texts = [visible_text(section) for section in doc.xpath(SECTION_XPATH)]
+
+    return pairs, body_text, section_texts
+
+
+def _default_fallback():
+    """Start a headless Selenium scraper (imported lazily, only when needed)"""
+    from finn_scraper_selenium import FinnPropertyScraperSelenium
+    return FinnPropertyScraperSelenium(headless=True)
+
+
+class FinnPropertyScraperHTTP:
+    def __init__(self, fallback=None, fallback_factory: Optional[Callable] = _default_fallback,
+                 timeout: float = 10.0, pool_size: int = 10, profile: RunProfile = None,
+                 rate_controller: AdaptiveRateController = None):
+        """
+        Scrape ad pages over a pooled keep-alive requests.Session
+        fallback: Existing scraper to use for blocked/incomplete pages (not closed by this scraper)
+        fallback_factory: Creates a fallback scraper on first need if fallback is not given (None = no fallback)
+        timeout: Request timeout in seconds
+        pool_size: Number of keep-alive connections kept open
+        profile: Where to record phase timings and counters
+        rate_controller: Told how each request went (blocked, timeout, incomplete, ...)
+        """
+        self.fallback = fallback
+        self.fallback_factory = fallback_factory
+        self._owns_fallback = False
+        self.timeout = timeout
+        self.rate_controller = rate_controller
+        self.profile = profile or RunProfile()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'nb-NO,nb;q=0.9,no;q=0.8,en;q=0.6',
+        })
+
+    def _get_fallback(self):
+        """Return the fallback scraper, creating it on first use"""
+        if self.fallback is None and self.fallback_factory is not None:
+            self.fallback = self.fallback_factory()
+            self._owns_fallback = True
+        return self.fallback
+
+    def _record(self, outcome: str):
+        if self.rate_controller is not None:
+            self.rate_controller.record(outcome)
+
+    def _use_fallback(self, property_data: Dict, reason: str) -> Dict:
+        """Scrape the page with the browser instead, or give up if there is no fallback"""
+        self.profile.count('browser_fallbacks')
+        fallback = self._get_fallback()
+        if fallback is not None:
+            print(f"  Fast path failed ({reason}), using browser")
+            # The fast attempt was this page's recorded request; the browser load only keeps to the pace
+            if self.rate_controller is not None:
+                self.rate_controller.pace()
+            return fallback.scrape_property(property_data['url'], record=False)
+
+        print(f"  WARNING: {reason}")
+        property_data['error'] = reason
+        return attach_price_history(property_data)
+
+    def scrape_property(self, url: str) -> Dict:
+        """Scrape individual property page for required information"""
+        property_data = new_property_data(url)
+
+        try:
+            with self.profile.phase('http_get'):
+                response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._record('timeout' if isinstance(e, requests.Timeout) else 'error')
+            return self._use_fallback(property_data, f'Request failed: {e}')
+
+        # Check if we got blocked or redirected
+        if 'blocked' in response.url.lower() or response.url != url:
+            self.profile.count('blocked_redirects')
+            self._record('blocked')
+            return self._use_fallback(property_data, f'Redirected to {response.url}')
+        if response.status_code != 200:
+            self._record('blocked' if response.status_code in (403, 429) else 'error')
+            return self._use_fallback(property_data, f'HTTP {response.status_code}')
+
+        with self.profile.phase('http_parse'):
+            pairs, body_text, section_texts = parse_ad_page(response.content)
+        with self.profile.phase('strategy_1_definition_list'):
+            apply_definition_list(property_data, pairs)
+        with self.profile.phase('strategy_2_body_text'):
+            apply_body_text(property_data, body_text)
+        with self.profile.phase('strategy_3_sections'):
+            apply_sections(property_data, section_texts)
+
+        # Only critical missing data (not felleskostnad) sends us to the browser
+        critical_missing = [m for m in missing_fields(property_data) if m != 'felleskostnad']
+        if critical_missing:
+            self._record('incomplete')
+            return self._use_fallback(property_data, f"Missing {', '.join(critical_missing)}")
+        self._record('success')
+
+        # Track price history
+        with self.profile.phase('price_history'):
+            return attach_price_history(property_data)
+
+    def close(self):
+        """Close the HTTP session and any browser started as fallback"""
+        self.session.close()
+        if self._owns_fallback and self.fallback is not None:
+            self.fallback.close()
+            self.fallback = None
+            self._owns_fallback = False
@@ -3,173 +3,381 @@ Web scraper for finn.no property listings in Trondheim using Selenium
 Extracts: Total price (inkl. fellesgjeld), Number of bedrooms, and Felleskostnad
 """
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-import time
 import json
-from typing import List, Dict, Optional
-import re
-from datetime import datetime
-from pathlib import Path
-from loan_calculator import calculate_loan
+import time
+from typing import List, Dict, Optional, Iterable, Iterator, Callable
+from loan_calculator import EXAMPLE_LOAN_PARAMS, calculate_loan_for_listing
+from finn_extract import (extract_finnkode, is_property_ad_url, search_page_url, is_sorted_by_price,
+                          parse_search_card, filter_listing_cards, extract_price, extract_number, extract_eieform,
+                          new_property_data, apply_definition_list, apply_body_text, apply_sections,
+                          missing_fields)
+from price_history import (PRICE_HISTORY_FILE, load_price_history, save_price_history, get_price_history_store,
+                           update_price_history, attach_price_history)
+from listing_cache import ListingCache
+from rate_control import RateLimiter, AdaptiveTimeout, AdaptiveRateController, classify_result
+from scrape_pool import ScraperPool
+from results_store import PropertyRecord, ResultsWriter, RESULTS_FILE
+from ranking import TopK
+from run_profile import RunProfile, PROFILE_FILE
+from chromedriver_cache import resolve_chromedriver, invalidate_driver_cache
+from resource_usage import process_tree_rss
+
+# Selenium is imported when the first browser starts (_import_selenium), so tools that
+# only use the helpers re-exported above, or read saved results, never load it
+webdriver = By = WebDriverWait = EC = Options = Service = None
+TimeoutException = WebDriverException = None
+
+
+def _import_selenium():
+    """Load the Selenium names used by the scraper into this module (once)"""
+    global webdriver, By, WebDriverWait, EC, Options, Service, TimeoutException, WebDriverException
+    if webdriver is not None:
+        return
+    from selenium import webdriver as selenium_webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    webdriver = selenium_webdriver
+
+CONSENT_CONTAINER_ID = "sp_message_container_1427790"
+
+# Resources the scraper never needs (block_resources); stylesheets only with block_css
+BLOCKED_IMAGE_URLS = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico']
+BLOCKED_FONT_URLS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+BLOCKED_CSS_URLS = ['*.css']
+
+# True once the key-info definition list (Totalpris / Soverom) is in the DOM
+KEY_INFO_READY_SCRIPT = """
+return Array.prototype.some.call(document.querySelectorAll('dl dt'), function (dt) {
+    return /totalpris|soverom/i.test(dt.textContent);
+});
+"""
 
-# File to store price history
-PRICE_HISTORY_FILE = Path(__file__).parent / "price_history.json"
+# All links on a search page with the text of their result card, in one round trip
+SEARCH_LINKS_SCRIPT = """
+return Array.prototype.map.call(document.querySelectorAll('a[href]'), function (a) {
+    var card = a.closest('article') || a;
+    return [a.href, (card.innerText || '').replace(/\\u00a0/g, ' ')];
+});
+"""
 
+# Collects the inputs of all three extraction strategies in one execute_script call.
+# innerText with non-breaking spaces replaced matches what WebElement.text returns.
+PAGE_SNAPSHOT_SCRIPT = """
+function text(el) { return (el.innerText || '').replace(/\\u00a0/g, ' ').trim(); }
+var pairs = [];
+document.querySelectorAll('dl').forEach(function (dl) {
+    var dts = dl.querySelectorAll('dt');
+    var dds = dl.querySelectorAll('dd');
+    for (var i = 0; i < Math.min(dts.length, dds.length); i++) {
+        pairs.push([text(dts[i]), text(dds[i])]);
+    }
+});
+var sections = [];
+document.querySelectorAll("[class*='info'], [class*='data'], [class*='details']").forEach(function (el) {
+    sections.push(text(el));
+});
+return {
+    url: window.location.href,
+    pairs: pairs,
+    body: document.body ? text(document.body) : '',
+    sections: sections
+};
+"""
 
-def load_price_history() -> Dict:
-    """Load price history from file"""
-    if PRICE_HISTORY_FILE.exists():
-        with open(PRICE_HISTORY_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
 
+# Browser memory is measured every this many pages (recycle_above_mb)
+MEMORY_CHECK_EVERY = 10
 
-def save_price_history(history: Dict):
-    """Save price history to file"""
-    with open(PRICE_HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+# Fields of a DevTools Cookie that Network.setCookies accepts back
+COOKIE_PARAM_KEYS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires', 'priority')
 
+# Origin and local storage of the current page
+LOCAL_STORAGE_SCRIPT = """
+var items = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+    var key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+return {origin: window.location.origin, items: items};
+"""
 
-def extract_finnkode(url: str) -> Optional[str]:
-    """Extract finnkode (property ID) from URL"""
-    match = re.search(r'finnkode=(\d+)', url)
-    if match:
-        return match.group(1)
-    return None
+# Called with (origin, items) on every new document; fills in local storage saved before a recycle
+RESTORE_LOCAL_STORAGE_SCRIPT = """
+function (origin, items) {
+    if (window.location.origin !== origin) return;
+    Object.keys(items).forEach(function (key) {
+        if (window.localStorage.getItem(key) === null) window.localStorage.setItem(key, items[key]);
+    });
+}
+"""
 
+class FinnPropertyScraperSelenium:
+    def __init__(self, headless: bool = True, profile: RunProfile = None, debugger_address: str = None,
+                 block_resources: bool = True, block_css: bool = False,
+                 rate_controller: AdaptiveRateController = None, recycle_after_pages: int = None,
+                 recycle_above_mb: float = None):
+        """
+        Initialize the scraper with Selenium
+        headless: Run browser in headless mode (no visible window)
+        profile: Where to record phase timings and counters (shared with parallel workers)
+        debugger_address: Attach to a Chrome already running with --remote-debugging-port,
+                          e.g. "127.0.0.1:9222", instead of starting a new one (close() leaves it running)
+        block_resources: Don't load images and fonts
+        block_css: Don't load stylesheets either
+        rate_controller: Paces scrape_all's ad page requests and is told how each page went
+                         (shared with parallel workers; None = fixed min_interval)
+        recycle_after_pages: Restart the browser after loading this many pages (None = never)
+        recycle_above_mb: Restart the browser once ChromeDriver + Chrome use more memory than this
+                          (checked every MEMORY_CHECK_EVERY pages; needs psutil or Linux /proc)
+        Recycling keeps cookies (cookie consent) and local storage; an attached browser is never recycled.
+        """
+        _import_selenium()
+        self.headless = headless
+        self.debugger_address = debugger_address
+        self.block_resources = block_resources
+        self.block_css = block_css
+        self.profile = profile or RunProfile()
+        self.rate_controller = rate_controller
+        self.recycle_after_pages = recycle_after_pages
+        self.recycle_above_mb = recycle_above_mb
+        self.base_url = "https://www.finn.no"
+        # False while iter_property_listings runs and when it ended early (error or max_pages)
+        self.search_complete = False
 
-def update_price_history(url: str, current_price: int) -> Dict:
-    """
-    Update price history for a property and return price change info.
-    Returns dict with 'previous_prices' list and 'price_change' if changed.
-    """
-    if not current_price:
-        return {'previous_prices': [], 'price_change': None}
+        # How long to wait for an ad page to become ready, adapted to observed load times
+        self.page_timeout = AdaptiveTimeout()
 
-    finnkode = extract_finnkode(url)
-    if not finnkode:
-        return {'previous_prices': [], 'price_change': None}
+        # Count WebDriver commands (each one is an HTTP round trip to chromedriver)
+        self.driver_commands = 0
+        self._start_browser()
 
-    history = load_price_history()
-    today = datetime.now().strftime('%Y-%m-%d')
+    def _chrome_options(self):
+        chrome_options = Options()
+        if self.debugger_address:
+            chrome_options.add_experimental_option('debuggerAddress', self.debugger_address)
+        else:
+            if self.headless:
+                chrome_options.add_argument('--headless')
+            chrome_options.add_argument('--disable-gpu')
+            chrome_options.add_argument('--no-sandbox')
+            chrome_options.add_argument('--disable-dev-shm-usage')
+            chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            if self.block_resources:
+                chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        return chrome_options
+
+    def _start_browser(self):
+        """Start (or attach to) Chrome and set up the driver"""
+        chrome_options = self._chrome_options()
+        # ChromeDriver path is cached between runs; reinstall once if the cached driver fails
+        with self.profile.phase('chromedriver_install'):
+            service = Service(resolve_chromedriver())
+        try:
+            with self.profile.phase('driver_start'):
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        except WebDriverException:
+            invalidate_driver_cache()
+            with self.profile.phase('chromedriver_install'):
+                service = Service(resolve_chromedriver())
+            with self.profile.phase('driver_start'):
+                self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        self._block_urls()
+        self.wait = WebDriverWait(self.driver, 10, poll_frequency=0.2)
+        self._count_driver_commands()
+        # Pages loaded by this browser instance
+        self.pages_loaded = 0
+
+    def _browser_rss_mb(self) -> Optional[float]:
+        """Memory used by ChromeDriver and the Chrome processes it started, in MB (None if unknown)"""
+        process = getattr(getattr(self.driver, 'service', None), 'process', None)
+        if process is None:
+            return None
+        rss = process_tree_rss(process.pid)
+        return rss / 2 ** 20 if rss is not None else None
+
+    def _before_page_load(self):
+        """Count the page about to be loaded; recycle the browser first if it is over a limit"""
+        if not self.debugger_address and self.pages_loaded:
+            reason = None
+            if self.recycle_after_pages and self.pages_loaded >= self.recycle_after_pages:
+                reason = f"{self.pages_loaded} pages"
+            elif self.pages_loaded % MEMORY_CHECK_EVERY == 0:
+                rss_mb = self._browser_rss_mb()
+                if rss_mb is not None:
+                    self.profile.observe('browser_rss_mb', rss_mb)
+                    if self.recycle_above_mb and rss_mb > self.recycle_above_mb:
+                        reason = f"{rss_mb:,.0f} MB after {self.pages_loaded} pages"
+            if reason:
+                self.recycle(reason)
+        self.pages_loaded += 1
+
+    def _save_session(self) -> Dict:
+        """Cookies of all sites and finn.no's local storage (where the consent choice is kept)"""
+        session = {'cookies': [], 'origin': None, 'local_storage': {}}
+        try:
+            session['cookies'] = self.driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        except WebDriverException as e:
+            print(f"  Could not read cookies: {e}")
+        try:
+            storage = self.driver.execute_script(LOCAL_STORAGE_SCRIPT)
+            if storage and storage['origin'].startswith(self.base_url):
+                session['origin'] = storage['origin']
+                session['local_storage'] = storage['items']
+        except WebDriverException:
+            pass
+        return session
+
+    def _restore_session(self, session: Dict):
+        """Put saved cookies and local storage into the new browser before it loads any page"""
+        cookies = [{key: cookie[key] for key in COOKIE_PARAM_KEYS if key in cookie}
+                   for cookie in session['cookies']]
+        for cookie in cookies:
+            if cookie.get('expires', 0) <= 0:
+                cookie.pop('expires', None)  # Session cookie
+        try:
+            if cookies:
+                self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+            if session['local_storage']:
+                # Runs before the page's own scripts on every new document of that origin
+                source = (f"({RESTORE_LOCAL_STORAGE_SCRIPT})"
+                          f"({json.dumps(session['origin'])}, {json.dumps(session['local_storage'])});")
+                self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': source})
+        except WebDriverException as e:
+            print(f"  Could not restore browser session: {e}")
+
+    def recycle(self, reason: str = 'requested'):
+        """
+        Replace the browser with a fresh one to give its memory back.
+        Cookies and local storage move to the new browser, so the cookie consent stays accepted;
+        everything else (results, price history, timeouts, counters) lives outside the browser.
+        """
+        start = time.monotonic()
+        with self.profile.phase('browser_recycle'):
+            session = self._save_session()
+            try:
+                self.driver.quit()
+            except Exception:
+                pass  # Already dead
+            self._start_browser()
+            self._restore_session(session)
+        self.profile.count('browser_recycles')
+        print(f"Recycled browser ({reason}) in {time.monotonic() - start:.1f} s, "
+              f"kept {len(session['cookies'])} cookies")
+
+    def _block_urls(self):
+        """Block image/font (and optionally CSS) requests through the DevTools protocol"""
+        patterns = []
+        if self.block_resources:
+            patterns += BLOCKED_IMAGE_URLS + BLOCKED_FONT_URLS
+        if self.block_css:
+            patterns += BLOCKED_CSS_URLS
+        if not patterns:
+            return
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        except WebDriverException as e:
+            print(f"Could not block resources: {e}")
 
-    if finnkode not in history:
-        history[finnkode] = {
-            'url': url,
-            'prices': []
-        }
+    def _count_driver_commands(self):
+        """Wrap driver.execute so every WebDriver command increments self.driver_commands"""
+        execute = self.driver.execute
 
-    prop_history = history[finnkode]
-    previous_prices = prop_history['prices']
-
-    # Check if price has changed since last record
-    price_change = None
-    if previous_prices:
-        last_price = previous_prices[-1]['price']
-        if last_price != current_price:
-            price_change = current_price - last_price
-            # Add new price record
-            prop_history['prices'].append({
-                'date': today,
-                'price': current_price
-            })
-    else:
-        # First time seeing this property
-        prop_history['prices'].append({
-            'date': today,
-            'price': current_price
-        })
-
-    # Update URL in case it changed
-    prop_history['url'] = url
-
-    save_price_history(history)
-
-    return {
-        'previous_prices': previous_prices,
-        'price_change': price_change
-    }
+        def counting_execute(driver_command, params=None):
+            self.driver_commands += 1
+            return execute(driver_command, params)
 
+        self.driver.execute = counting_execute
 
-class FinnPropertyScraperSelenium:
-    def __init__(self, headless: bool = True):
+    def get_property_listings(self, search_url: str = None, max_price: int = None) -> List[Dict]:
         """
-        Initialize the scraper with Selenium
-        headless: Run browser in headless mode (no visible window)
+        Get property listings from all search result pages
+        search_url: Custom search URL with filters, or None for default Trondheim search
+        max_price: Stop paging once results sorted by price pass this price
+        Returns card data per listing: url, finnkode, card_price, card_bedrooms
         """
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-
-        # Auto-install ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.base_url = "https://www.finn.no"
-        self.wait = WebDriverWait(self.driver, 10)
+        return list(self.iter_property_listings(search_url=search_url, max_price=max_price))
 
-    def get_property_listings(self, search_url: str = None) -> List[str]:
+    def iter_property_listings(self, search_url: str = None, max_price: int = None,
+                               max_pages: int = 50) -> Iterator[Dict]:
         """
-        Get property listing URLs from search results
-        search_url: Custom search URL with filters, or None for default Trondheim search
+        Yield search result cards page by page, so ad pages can be scraped while
+        later result pages are still to be loaded.
+        Follows the page= parameter until a page has no new listings, max_pages is
+        reached, or (for searches sorted by PRICE_ASC) the cards pass max_price.
+        Afterwards search_complete tells whether every listing within max_price was seen
+        (False if a search page failed or max_pages cut the search short).
         """
         if search_url is None:
             search_url = f"{self.base_url}/realestate/homes/search.html?location=0.20001"
 
-        property_urls = []
+        seen = set()
+        stop_at_price = max_price if max_price and is_sorted_by_price(search_url) else None
+        self.search_complete = False
 
-        try:
-            print(f"Loading search page: {search_url}")
-            self.driver.get(search_url)
-
-            # Wait for page to load
-            time.sleep(1)
-
-            # Try to find property links
-            # Look for links that contain /realestate/homes/ad.html
-            links = self.driver.find_elements(By.TAG_NAME, 'a')
-
-            for link in links:
-                try:
-                    href = link.get_attribute('href')
-                    if href and ('/realestate/homes/ad.html' in href or '/ad.html?finnkode=' in href):
-                        # Skip project listings (multiple apartments) and planned properties
-                        if '/realestate/project/' in href or '/realestate/projectsingle/' in href or '/realestate/planned/' in href:
-                            continue
-                        if href not in property_urls:
-                            property_urls.append(href)
-                except:
+        for page in range(1, max_pages + 1):
+            page_url = search_page_url(search_url, page)
+            try:
+                print(f"Loading search page {page}: {page_url}")
+                links = self._read_search_page(page_url)
+            except Exception as e:
+                print(f"Error fetching listings: {e}")
+                self.driver.save_screenshot('error_screenshot.png')
+                return
+
+            cards = []
+            for href, card_text in links:
+                if not is_property_ad_url(href):
                     continue
+                key = extract_finnkode(href) or href
+                if key in seen:
+                    continue
+                seen.add(key)
+                cards.append(parse_search_card(href, card_text))
+
+            print(f"Found {len(cards)} property listings on page {page}")
+
+            if not cards:
+                if page == 1:
+                    # Save screenshot for debugging
+                    self.driver.save_screenshot('finn_search_screenshot.png')
+                    print("No properties found. Screenshot saved to finn_search_screenshot.png")
+                    print("Check if there are actually listings on finn.no for Trondheim")
+                self.search_complete = True
+                return
+
+            yield from cards
+
+            # Sorted by price: once the last card is over budget, later pages are too
+            last_price = cards[-1]['card_price']
+            if stop_at_price and last_price and last_price > stop_at_price:
+                print(f"Stopping search: listings are now over {stop_at_price:,} kr")
+                self.search_complete = True
+                return
+
+    def _read_search_page(self, page_url: str) -> List[List[str]]:
+        """Load a search result page and return [href, card text] for every link in one script call"""
+        self._before_page_load()
+        with self.profile.phase('search_page'):
+            self.driver.get(page_url)
+
+            # Wait for the first ad link to appear (or give up after self.wait's timeout)
+            try:
+                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='ad.html']")))
+            except TimeoutException:
+                pass
 
-            print(f"Found {len(property_urls)} property listings")
-
-            if len(property_urls) == 0:
-                # Save screenshot for debugging
-                self.driver.save_screenshot('finn_search_screenshot.png')
-                print("No properties found. Screenshot saved to finn_search_screenshot.png")
-                print("Check if there are actually listings on finn.no for Trondheim")
-
-        except Exception as e:
-            print(f"Error fetching listings: {e}")
-            self.driver.save_screenshot('error_screenshot.png')
-
-        return property_urls
+            return self.driver.execute_script(SEARCH_LINKS_SCRIPT)
 
     def _try_dismiss_cookie_popup(self):
         """Try to dismiss cookie popup if present (Finn.no uses iframe for consent)"""
         try:
             # Check for Finn.no consent iframe (sp_message_container)
-            consent_container = self.driver.find_elements(By.ID, "sp_message_container_1427790")
+            consent_container = self.driver.find_elements(By.ID, CONSENT_CONTAINER_ID)
             if consent_container:
                 # Try to find and switch to the consent iframe
                 iframes = self.driver.find_elements(By.XPATH, "//iframe[contains(@id, 'sp_message_iframe')]")
@@ -182,8 +390,8 @@ class FinnPropertyScraperSelenium:
                         for btn in accept_buttons:
                             try:
                                 btn.click()
-                                time.sleep(0.5)
                                 self.driver.switch_to.default_content()
+                                self._wait_for_consent_gone()
                                 return True
                             except:
                                 continue
@@ -193,274 +401,401 @@ class FinnPropertyScraperSelenium:
                         continue
 
                 # If clicking didn't work, try removing the overlay with JavaScript
-                self.driver.execute_script("""
-                    var container = document.getElementById('sp_message_container_1427790');
-                    if (container) container.remove();
-                """)
-                time.sleep(0.3)
+                self.driver.execute_script(
+                    "var container = document.getElementById(arguments[0]);"
+                    "if (container) container.remove();",
+                    CONSENT_CONTAINER_ID)
                 return True
         except:
             pass
         return False
 
-    def scrape_property(self, url: str, retry_count: int = 0) -> Dict:
+    def _wait_for(self, condition, timeout: float) -> bool:
+        """Wait until condition holds; False on timeout"""
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(condition)
+            return True
+        except TimeoutException:
+            return False
+
+    def _wait_for_consent_gone(self, timeout: float = 3.0) -> bool:
+        """Wait until the consent overlay has closed"""
+        return self._wait_for(EC.invisibility_of_element_located((By.ID, CONSENT_CONTAINER_ID)), timeout)
+
+    def _wait_until_ready(self, url: str, timeout: float) -> bool:
+        """
+        Wait until the key-info list is in the DOM, or we were redirected away.
+        Ready times feed the adaptive page timeout.
+        """
+        start = time.monotonic()
+        ready = self._wait_for(
+            lambda driver: driver.execute_script(KEY_INFO_READY_SCRIPT) or driver.current_url != url,
+            timeout)
+        if ready:
+            self.page_timeout.observe(time.monotonic() - start)
+        return ready
+
+    def scrape_property(self, url: str, retry_count: int = 0, record: bool = True) -> Dict:
         """
         Scrape individual property page for required information
         retry_count: Number of retries attempted (for cookie popup handling)
+        record: Report the outcome to the rate controller (False when the page was already
+                recorded, e.g. as the browser fallback of the HTTP engine)
         """
-        finnkode = extract_finnkode(url) or "unknown"
-
-        property_data = {
-            'url': url,
-            'finnkode': finnkode,
-            'totalpris_inkl_fellesgjeld': None,
-            'antall_soverom': None,
-            'felleskostnad': None,
-            'eieform': None  # selveier, aksje, or andel
-        }
+        commands_before = self.driver_commands
+        with self.profile.phase('scrape_property'):
+            property_data = self._scrape_page(url, retry_count)
+        if record and self.rate_controller is not None:
+            self.rate_controller.record(classify_result(property_data))
+        commands = self.driver_commands - commands_before
+        self.profile.observe('driver_commands_per_listing', commands)
+        print(f"  {commands} driver round trips")
+        return property_data
+
+    def _snapshot_page(self) -> Dict:
+        """
+        Read everything the extraction strategies need in a single round trip:
+        current URL, dt/dd text pairs, body text and info/data/details section texts
+        """
+        return self.driver.execute_script(PAGE_SNAPSHOT_SCRIPT)
+
+    def _extract_page(self, url: str, property_data: Dict) -> bool:
+        """Extract fields from the loaded DOM; False if we were blocked or redirected"""
+        with self.profile.phase('page_snapshot'):
+            snapshot = self._snapshot_page()
+
+        # Check if we got blocked or redirected
+        current_url = snapshot['url']
+        if 'blocked' in current_url.lower() or current_url != url:
+            print(f"  WARNING: Possible redirect or block. Current URL: {current_url}")
+            property_data['error'] = f'Redirected to {current_url}'
+            self.profile.count('blocked_redirects')
+            return False
+
+        # Strategy 1: Look for dl/dt/dd elements (definition lists)
+        with self.profile.phase('strategy_1_definition_list'):
+            apply_definition_list(property_data, snapshot['pairs'])
+
+        # Strategy 2: Search through all visible text on the page
+        with self.profile.phase('strategy_2_body_text'):
+            apply_body_text(property_data, snapshot['body'])
+
+        # Strategy 3: Try to find data in structured elements
+        with self.profile.phase('strategy_3_sections'):
+            apply_sections(property_data, snapshot['sections'])
+        return True
+
+    def _critical_missing(self, property_data: Dict) -> List[str]:
+        """Missing fields we cannot do without (not felleskostnad)"""
+        return [m for m in missing_fields(property_data) if m != 'felleskostnad']
+
+    def _scrape_page(self, url: str, retry_count: int) -> Dict:
+        """Load an ad page and extract its fields"""
+        property_data = new_property_data(url)
 
         try:
-            self.driver.get(url)
-            time.sleep(0.6)
+            self._before_page_load()
+            with self.profile.phase('ad_page_load'):
+                self.driver.get(url)
+            with self.profile.phase('ad_page_ready'):
+                self._wait_until_ready(url, self.page_timeout.timeout)
 
             # Try to dismiss cookie popup
-            self._try_dismiss_cookie_popup()
+            with self.profile.phase('cookie_popup'):
+                self._try_dismiss_cookie_popup()
 
-            # Check if we got blocked or redirected
-            current_url = self.driver.current_url
-            if 'blocked' in current_url.lower() or current_url != url:
-                print(f"  WARNING: Possible redirect or block. Current URL: {current_url}")
-                property_data['error'] = f'Redirected to {current_url}'
+            if not self._extract_page(url, property_data):
                 return property_data
 
-            # Get all text content
-            page_text = self.driver.page_source
-
-            # Try to find elements with specific text
-            # Strategy 1: Look for dl/dt/dd elements (definition lists)
-            try:
-                dl_elements = self.driver.find_elements(By.TAG_NAME, 'dl')
-                for dl in dl_elements:
-                    try:
-                        dts = dl.find_elements(By.TAG_NAME, 'dt')
-                        dds = dl.find_elements(By.TAG_NAME, 'dd')
-
-                        for dt, dd in zip(dts, dds):
-                            label = dt.text.lower().strip()
-                            value = dd.text.strip()
-
-                            if 'totalpris' in label:
-                                property_data['totalpris_inkl_fellesgjeld'] = self._extract_price(value)
-
-                            elif 'soverom' in label:
-                                property_data['antall_soverom'] = self._extract_number(value)
-
-                            elif 'felleskost' in label or 'fellesutgifter' in label:
-                                property_data['felleskostnad'] = self._extract_price(value)
-
-                            elif 'eieform' in label:
-                                property_data['eieform'] = self._extract_eieform(value)
-                    except:
-                        continue
-            except:
-                pass
-
-            # Strategy 2: Search through all visible text on the page
-            try:
-                body_text = self.driver.find_element(By.TAG_NAME, 'body').text
-
-                # Look for "Totalpris" followed by a price
-                totalpris_match = re.search(r'Totalpris.*?(\d[\d\s]+)', body_text)
-                if totalpris_match and not property_data['totalpris_inkl_fellesgjeld']:
-                    property_data['totalpris_inkl_fellesgjeld'] = self._extract_price(totalpris_match.group(1))
-
-                # Look for bedroom count
-                soverom_match = re.search(r'(\d+)\s*soverom', body_text, re.IGNORECASE)
-                if soverom_match and not property_data['antall_soverom']:
-                    property_data['antall_soverom'] = int(soverom_match.group(1))
-
-                # Look for felleskostnad (multiple patterns)
-                felles_match = re.search(r'Felleskost(?:nad|/mnd\.).*?(\d[\d\s]+)', body_text)
-                if felles_match and not property_data['felleskostnad']:
-                    property_data['felleskostnad'] = self._extract_price(felles_match.group(1))
-
-                # Look for eieform
-                eieform_match = re.search(r'Eieform[:\s]*(Selveier|Aksje|Andel)', body_text, re.IGNORECASE)
-                if eieform_match and not property_data['eieform']:
-                    property_data['eieform'] = self._extract_eieform(eieform_match.group(1))
-
-            except:
-                pass
-
-            # Strategy 3: Try to find data in structured elements
-            try:
-                # Look for divs or sections with class containing "info", "data", "details"
-                info_sections = self.driver.find_elements(By.XPATH,
-                    "//*[contains(@class, 'info') or contains(@class, 'data') or contains(@class, 'details')]")
-
-                for section in info_sections:
-                    text = section.text
-
-                    if 'Totalpris' in text and not property_data['totalpris_inkl_fellesgjeld']:
-                        property_data['totalpris_inkl_fellesgjeld'] = self._extract_price(text)
-
-                    if 'soverom' in text.lower() and not property_data['antall_soverom']:
-                        property_data['antall_soverom'] = self._extract_number(text)
-
-                    if 'Felleskostnad' in text and not property_data['felleskostnad']:
-                        property_data['felleskostnad'] = self._extract_price(text)
-            except:
-                pass
-
         except Exception as e:
             print(f"  ERROR scraping property {url}: {e}")
             property_data['error'] = str(e)
+            self.profile.count('errors')
 
         # Log what we found (or didn't find)
-        missing = []
-        if not property_data['totalpris_inkl_fellesgjeld']:
-            missing.append('totalpris')
-        if not property_data['antall_soverom']:
-            missing.append('soverom')
-        if not property_data['felleskostnad']:
-            missing.append('felleskostnad')
-
-        if missing:
-            # Only warn about critical missing data (not felleskostnad)
-            critical_missing = [m for m in missing if m != 'felleskostnad']
-            if critical_missing:
-                # Retry once if critical data is missing (might be cookie popup)
-                if retry_count < 1:
-                    print(f"  Retrying (possible cookie popup)...")
-                    time.sleep(0.5)
-                    return self.scrape_property(url, retry_count=retry_count + 1)
-                print(f"  WARNING: Missing {', '.join(critical_missing)}")
-
-        # Track price history
-        price_info = update_price_history(url, property_data['totalpris_inkl_fellesgjeld'])
-        property_data['previous_prices'] = price_info['previous_prices']
-        property_data['price_change'] = price_info['price_change']
+        critical_missing = self._critical_missing(property_data)
 
-        if price_info['price_change']:
-            change = price_info['price_change']
-            direction = "↓" if change < 0 else "↑"
-            print(f"  PRICE CHANGE: {direction} {abs(change):,} kr")
+        if critical_missing and retry_count < 1 and 'error' not in property_data:
+            # First re-extract from the page we already have: a late cookie popup
+            # or slow rendering is more likely than a bad page load
+            print(f"  Waiting for missing data...")
+            self.profile.count('re_extracts')
+            try:
+                self._try_dismiss_cookie_popup()
+                self._wait_until_ready(url, self.page_timeout.max_timeout)
+                if not self._extract_page(url, property_data):
+                    return property_data
+            except Exception as e:
+                print(f"  ERROR re-reading property {url}: {e}")
+            critical_missing = self._critical_missing(property_data)
+
+        if critical_missing:
+            # Reload once if critical data is still missing
+            if retry_count < 1:
+                print(f"  Retrying (reloading page)...")
+                self.profile.count('retries')
+                return self._scrape_page(url, retry_count + 1)
+            print(f"  WARNING: Missing {', '.join(critical_missing)}")
+            self.profile.count('incomplete_listings')
 
-        return property_data
+        # Track price history
+        with self.profile.phase('price_history'):
+            return attach_price_history(property_data)
 
     def _extract_price(self, text: str) -> int:
         """Extract price from text (removes spaces, 'kr', etc.)"""
-        if not text:
-            return None
-        # Remove non-numeric characters except digits
-        numbers = re.findall(r'\d+', text.replace(' ', ''))
-        if numbers:
-            return int(''.join(numbers))
-        return None
+        return extract_price(text)
 
     def _extract_number(self, text: str) -> int:
         """Extract a single number from text"""
-        if not text:
-            return None
-        numbers = re.findall(r'\d+', text)
-        if numbers:
-            return int(numbers[0])
-        return None
+        return extract_number(text)
 
     def _extract_eieform(self, text: str) -> str:
         """Extract and normalize eieform (ownership type)"""
-        if not text:
-            return None
-        text_lower = text.lower().strip()
-        if 'selveier' in text_lower:
-            return 'Selveier'
-        elif 'aksje' in text_lower:
-            return 'Aksje'
-        elif 'andel' in text_lower:
-            return 'Andel'
-        return None
+        return extract_eieform(text)
+
+    def _scrape_sequential(self, cards: Iterable[Dict], ad_scraper=None, lookup=None):
+        """Scrape listings one at a time, yielding (card, data)"""
+        ad_scraper = ad_scraper or self
+        for i, card in enumerate(cards, 1):
+            data = lookup(card) if lookup else None
+            if data is None:
+                if self.rate_controller is not None:
+                    self.rate_controller.wait()
+                print(f"Scraping property {i}: {card['url']}")
+                data = ad_scraper.scrape_property(card['url'])
+            yield card, data
+
+    def _ad_scraper_factory(self, engine: str):
+        """Factory for the scrapers used by parallel workers"""
+        if engine == 'http':
+            from finn_scraper_http import FinnPropertyScraperHTTP
+            return lambda: FinnPropertyScraperHTTP(
+                fallback_factory=lambda: FinnPropertyScraperSelenium(**self._worker_options()),
+                profile=self.profile, rate_controller=self.rate_controller)
+        return lambda: FinnPropertyScraperSelenium(**self._worker_options())
+
+    def _worker_options(self) -> Dict:
+        """Options for the extra browsers of parallel workers (always launched, never attached)"""
+        return {
+            'headless': self.headless,
+            'profile': self.profile,
+            'block_resources': self.block_resources,
+            'block_css': self.block_css,
+            'rate_controller': self.rate_controller,
+            'recycle_after_pages': self.recycle_after_pages,
+            'recycle_above_mb': self.recycle_above_mb,
+        }
 
-    def scrape_all(self, search_url: str = None, max_price: int = None, loan_params: dict = None) -> List[Dict]:
+    def scrape_all(self, search_url: str = None, max_price: int = None, loan_params: dict = None,
+                   workers: int = 1, min_interval: float = 1.0, engine: str = 'selenium',
+                   min_bedrooms: int = None, cache: ListingCache = None,
+                   on_result: Callable[[PropertyRecord], None] = None, top_k: int = None,
+                   rank_by: str = 'net_monthly_cost',
+                   on_rank_update: Callable[[List[PropertyRecord]], None] = None,
+                   close_browser: bool = True, host_limits: Dict = None,
+                   cards: Iterable[Dict] = None) -> List[PropertyRecord]:
         """
         Scrape all properties from Trondheim
         search_url: Custom search URL with filters
         max_price: Maximum property price to consider
         loan_params: Loan calculation parameters
+        min_bedrooms: Skip listings whose search card shows fewer bedrooms
+        workers: Number of browsers scraping ad pages in parallel (1 = use this scraper's browser)
+        min_interval: Minimum seconds between ad page requests across all workers (workers > 1;
+                      replaced by the scraper's rate_controller if it has one)
+        engine: 'selenium' loads every ad page in the browser, 'http' fetches them with
+                requests + lxml and only uses the browser for blocked or incomplete pages,
+                'async' does the same in an asyncio pipeline (workers fetches in flight,
+                at most one request per min_interval per host unless host_limits says otherwise)
+        cache: Reuse fields of listings scraped recently whose card price has not changed
+        on_result: Called with each finished listing, e.g. ResultsWriter.write
+        top_k: Only keep the K best listings (None = keep all)
+        rank_by: 'net_monthly_cost', 'net_after_appreciation' or 'price_per_bedroom' (lowest first)
+        on_rank_update: Called with the current ranking whenever a listing enters it (top_k only)
+        close_browser: Close this scraper's browser when done (False keeps the session for the next call)
+        host_limits: engine='async' only: {host: (max concurrent requests, min seconds between requests)}
+        cards: Search cards to scrape instead of search_url's results (e.g. merged from several searches)
+        Returns the ranked PropertyRecords (they also support the old dict-style access)
         """
+        scraped = None
+        ad_scraper = None
+        ranking = TopK(top_k, rank_by)
         try:
             print("Fetching property listings...")
-            property_urls = self.get_property_listings(search_url=search_url)
-
-            results = []
-            consecutive_over_budget = 0
-            max_consecutive_over_budget = 3  # Stop after 3 consecutive properties over budget
-
-            for i, url in enumerate(property_urls, 1):
-                print(f"Scraping property {i}/{len(property_urls)}: {url}")
-                data = self.scrape_property(url)
+            # Streams cards: ad pages are scraped while later search pages are still to come.
+            # Listings that are over budget or too small according to their card are never opened.
+            if cards is None:
+                cards = self.iter_property_listings(search_url=search_url, max_price=max_price)
+            cards = filter_listing_cards(cards, max_price=max_price, min_bedrooms=min_bedrooms)
+
+            def from_cache(card: Dict) -> Optional[Dict]:
+                data = cache.get(card)
+                if data is not None:
+                    print(f"Using cached data for {card['url']}")
+                    data['from_cache'] = True
+                    self.profile.count('cache_hits')
+                    with self.profile.phase('price_history'):
+                        attach_price_history(data)
+                return data
+
+            lookup = from_cache if cache is not None else None
+
+            def finish(card: Dict, data: Dict) -> bool:
+                """Cache, price-check, price and rank one listing; False if it is over budget"""
+                if cache is not None and not data.get('from_cache') and cache.put(card, data):
+                    print(f"  Ad changed since last scrape")
 
                 # Filter by max price if specified
                 if max_price and data.get('totalpris_inkl_fellesgjeld'):
                     if data['totalpris_inkl_fellesgjeld'] > max_price:
                         print(f"  Skipping: price {data['totalpris_inkl_fellesgjeld']:,} kr > {max_price:,} kr")
-                        consecutive_over_budget += 1
+                        return False
 
-                        # If results are sorted by price and we've hit multiple over budget, stop
-                        if consecutive_over_budget >= max_consecutive_over_budget:
-                            print(f"\nStopping: Found {max_consecutive_over_budget} consecutive properties over budget.")
-                            print(f"Remaining properties will also be over {max_price:,} kr.")
-                            break
-                        continue
-                    else:
+                # Calculate loan if we have all required data and loan_params
+                if loan_params and 'loan_calculation' not in data:
+                    loan_result = calculate_loan_for_listing(data, loan_params)
+                    if loan_result:
+                        data['loan_calculation'] = loan_result
+
+                record = PropertyRecord.from_property(data)
+                if on_result is not None:
+                    on_result(record)
+
+                # Only the K best records are kept; show the ranking as it changes
+                rank = ranking.push(record)
+                if rank is not None and ranking.value(record) != float('inf'):
+                    print(f"  Rank {rank} by {rank_by}: {ranking.value(record):,.0f} kr")
+                    # A snapshot of an unbounded ranking per listing would make the run quadratic
+                    if on_rank_update is not None and top_k is not None:
+                        on_rank_update(ranking.ranked())
+                return True
+
+            if engine == 'async':
+                from async_pipeline import AsyncPipeline
+                # Price history and loans are handled by the pipeline's own stages
+                pipeline = AsyncPipeline(
+                    loan_params=loan_params,
+                    lookup=lookup,
+                    fallback=self,
+                    fetch_workers=max(workers, 2),
+                    host_limits=host_limits,
+                    default_host_limit=(workers, min_interval),
+                    profile=self.profile,
+                )
+                stats = pipeline.run(cards, finish)
+                print(f"Pipeline: {stats['finished']} listings, {stats['cached']} cached, "
+                      f"{stats['fallbacks']} browser fallbacks, {stats['errors']} errors")
+                return ranking.ranked()
+
+            if workers > 1:
+                print(f"Scraping with {workers} parallel workers")
+                pool = ScraperPool(
+                    self._ad_scraper_factory(engine),
+                    workers=workers,
+                    rate_limiter=self.rate_controller or RateLimiter(min_interval),
+                )
+                scraped = pool.scrape(cards, lookup=lookup)
+            else:
+                if engine == 'http':
+                    from finn_scraper_http import FinnPropertyScraperHTTP
+                    ad_scraper = FinnPropertyScraperHTTP(fallback=self, profile=self.profile,
+                                                         rate_controller=self.rate_controller)
+                scraped = self._scrape_sequential(cards, ad_scraper, lookup=lookup)
+
+            consecutive_over_budget = 0
+            max_consecutive_over_budget = 3  # Stop after 3 consecutive properties over budget
+
+            # Results arrive in search order even when scraped in parallel,
+            # so the consecutive over-budget check still sees them sorted
+            for i, (card, data) in enumerate(scraped, 1):
+                if workers > 1:
+                    print(f"Scraped property {i}: {card['url']}")
+
+                if finish(card, data):
+                    if data.get('totalpris_inkl_fellesgjeld'):
                         # Reset counter if we find one within budget
                         consecutive_over_budget = 0
+                    continue
 
-                # Calculate loan if we have all required data and loan_params
-                if loan_params and data.get('totalpris_inkl_fellesgjeld') and data.get('antall_soverom'):
-                    # Use 0 for felleskostnad if missing or None
-                    felleskostnad = data.get('felleskostnad') or 0
-                    # Default to 'Selveier' if eieform is missing (conservative assumption)
-                    eieform = data.get('eieform') or 'Selveier'
-
-                    loan_result = calculate_loan(
-                        property_price=data['totalpris_inkl_fellesgjeld'],
-                        down_payment=loan_params['down_payment'],
-                        loan_term_years=loan_params['loan_term_years'],
-                        annual_interest_rate=loan_params['annual_interest_rate'],
-                        num_bedrooms=data['antall_soverom'],
-                        num_co_owners=loan_params['num_co_owners'],
-                        rent_per_room=loan_params['rent_per_room'],
-                        total_common_costs=felleskostnad,
-                        annual_appreciation_rate=loan_params['annual_appreciation_rate'],
-                        eieform=eieform,
-                    )
-                    data['loan_calculation'] = loan_result
-
-                results.append(data)
-
-            # Sort by net_monthly_cost if loan calculations were done
-            if loan_params:
-                results = sorted(
-                    results,
-                    key=lambda x: (x.get('loan_calculation') or {}).get('net_monthly_cost', float('inf'))
-                )
+                consecutive_over_budget += 1
+                # If results are sorted by price and we've hit multiple over budget, stop
+                if consecutive_over_budget >= max_consecutive_over_budget:
+                    print(f"\nStopping: Found {max_consecutive_over_budget} consecutive properties over budget.")
+                    print(f"Remaining properties will also be over {max_price:,} kr.")
+                    break
 
-            return results
+            return ranking.ranked()
 
         finally:
-            # Always close the browser
-            self.close()
+            # Stop any parallel workers still running, then close the browser
+            if scraped is not None:
+                scraped.close()
+            if ad_scraper is not None:
+                ad_scraper.close()
+            if cache is not None:
+                cache.save()
+                print(f"Listing cache: {cache.hits} reused, {cache.misses} scraped")
+            if self.rate_controller is not None:
+                stats = self.rate_controller.stats()
+                print(f"Adaptive rate: {stats['listings_per_minute']:.0f} listings/min, "
+                      f"error budget {stats['error_budget']:.0%} left, {stats['blocked']} blocked, "
+                      f"circuit opened {stats['circuit_trips']} times")
+            recycle_times = self.profile.timings.get('browser_recycle')
+            if recycle_times:
+                print(f"Browser recycled {len(recycle_times)} times, {sum(recycle_times):.1f} s in total")
+            if close_browser:
+                self.close()
 
     def close(self):
-        """Close the browser"""
+        """Close the browser (an attached browser is left running)"""
         if self.driver:
-            self.driver.quit()
+            if self.debugger_address:
+                self.driver.service.stop()
+            else:
+                self.driver.quit()
+            self.driver = None
+
+
+def _config_value(name: str, default):
+    """Read an optional setting from my_config.py"""
+    try:
+        import my_config
+    except ImportError:
+        return default
+    return getattr(my_config, name, default)
+
+
+def _adaptive_rate_controller() -> Optional[AdaptiveRateController]:
+    """Rate controller from the optional ADAPTIVE_RATE setting (True, or a dict of its options)"""
+    setting = _config_value('ADAPTIVE_RATE', False)
+    if not setting:
+        return None
+    return AdaptiveRateController(**(setting if isinstance(setting, dict) else {}))
+
+
+def _budget_max_price(max_price: Optional[int], loan_params: dict, monthly_budget: float) -> Optional[int]:
+    """max_price lowered to the highest price that fits monthly_budget (BUDGET_TARGET, BUDGET_MAX_BEDROOMS)"""
+    from loan_solver import budget_max_price
+
+    limit = budget_max_price(max_price, loan_params, monthly_budget,
+                             max_bedrooms=_config_value('BUDGET_MAX_BEDROOMS', 6),
+                             target=_config_value('BUDGET_TARGET', 'net_monthly_cost'))
+    if limit != max_price:
+        print(f"Monthly budget {monthly_budget:,.0f} kr: only considering prices up to {limit:,} kr")
+    return limit
 
 
 def main():
     """
     Example usage
     """
+    # Several searches / loan setups sharing one crawl (see multi_profile.py)
+    if _config_value('PROFILES', None):
+        from multi_profile import main as multi_profile_main
+        multi_profile_main()
+        return
+
     # Try to load personal config, fall back to example values
     try:
         from my_config import SEARCH_URL, LOAN_PARAMS, MAX_PRICE
@@ -474,29 +809,56 @@ def main():
 
         # Example values - replace these or create my_config.py
         search_url = "<Insert your finn.no search URL here>"
-        loan_params = {
-            'down_payment': 500_000,  # Your down payment (egenkapital)
-            'loan_term_years': 30,
-            'annual_interest_rate': 0.05,
-            'num_co_owners': 2,
-            'rent_per_room': 6_000,
-            'annual_appreciation_rate': 0.03,
-        }
+        loan_params = EXAMPLE_LOAN_PARAMS
         max_price = 5_000_000
 
-    scraper = FinnPropertyScraperSelenium(headless=False)  # Set to True to hide browser
+    # Optional settings
+    workers = _config_value('WORKERS', 1)
+    engine = _config_value('ENGINE', 'selenium')
+    min_bedrooms = _config_value('MIN_BEDROOMS', None)
+    cache_ttl_hours = _config_value('CACHE_TTL_HOURS', 24)
+    cache = ListingCache(ttl_hours=cache_ttl_hours) if cache_ttl_hours else None
+    top_k = _config_value('TOP_K', None)
+    rank_by = _config_value('RANK_BY', 'net_monthly_cost')
+    monthly_budget = _config_value('MONTHLY_BUDGET', None)
+    if monthly_budget is not None:
+        try:
+            max_price = _budget_max_price(max_price, loan_params, monthly_budget)
+        except ValueError as e:
+            print(e)
+            return
+
+    scraper = FinnPropertyScraperSelenium(
+        headless=False,  # Set to True to hide browser
+        debugger_address=_config_value('CHROME_DEBUGGER_ADDRESS', None),
+        block_resources=_config_value('BLOCK_RESOURCES', True),
+        block_css=_config_value('BLOCK_CSS', False),
+        rate_controller=_adaptive_rate_controller(),
+        recycle_after_pages=_config_value('RECYCLE_AFTER_PAGES', 300),
+        recycle_above_mb=_config_value('RECYCLE_ABOVE_MB', 1500),
+    )
+    writer = ResultsWriter(RESULTS_FILE)
 
     try:
-        # Scrape all properties up to max_price
+        # Scrape all properties up to max_price; each finished listing is saved right away
         properties = scraper.scrape_all(
             search_url=search_url,
             max_price=max_price,
-            loan_params=loan_params
+            loan_params=loan_params,
+            workers=workers,
+            engine=engine,
+            min_bedrooms=min_bedrooms,
+            cache=cache,
+            on_result=writer.write,
+            top_k=top_k,
+            rank_by=rank_by,
+            host_limits=_config_value('HOST_LIMITS', None),
         )
 
         # Display results
         print("\n" + "="*80)
-        print("RESULTS (sorted by lowest net monthly cost)")
+        shown = f"top {top_k}" if top_k else "all"
+        print(f"RESULTS ({shown}, sorted by lowest {rank_by.replace('_', ' ')})")
         print("="*80 + "\n")
 
         for i, prop in enumerate(properties, 1):
@@ -536,17 +898,17 @@ def main():
                 print(f"  Netto etter verdistigning:    {loan['net_after_appreciation']:>10,.0f} kr")
             print()
 
-        # Save to JSON file
-        with open('finn_properties_selenium.json', 'w', encoding='utf-8') as f:
-            json.dump(properties, f, ensure_ascii=False, indent=2)
-
-        print(f"Results saved to finn_properties_selenium.json")
-        print(f"Total properties found: {len(properties)}")
+        print(f"Results saved to {RESULTS_FILE}")
+        print(f"Total properties found: {writer.count}")
 
     except Exception as e:
         print(f"Error: {e}")
     finally:
+        writer.close()
         scraper.close()
+        scraper.profile.print_summary()
+        scraper.profile.save(PROFILE_FILE)
+        print(f"Run profile appended to {PROFILE_FILE}")
 
 
 if __name__ == "__main__":
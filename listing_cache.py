@@ -0,0 +1,116 @@
+"""
+Persistent cache of extracted ad-page fields per finnkode
+Lets a daily run skip ad pages that are still fresh and whose search card price
+has not changed since they were scraped.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from finn_extract import missing_fields
+
+# File to store cached listings
+LISTING_CACHE_FILE = Path(__file__).parent / "listing_cache.json"
+
+# Fields taken from the ad page; everything else is recomputed on each run
+CACHED_FIELDS = ('url', 'finnkode', 'totalpris_inkl_fellesgjeld', 'antall_soverom', 'felleskostnad', 'eieform')
+
+
+def fingerprint(property_data: Dict) -> str:
+    """Hash of the extracted fields, to tell whether an ad changed between fetches"""
+    content = json.dumps([property_data.get(field) for field in CACHED_FIELDS[2:]], ensure_ascii=False)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class ListingCache:
+    def __init__(self, path: Path = LISTING_CACHE_FILE, ttl_hours: float = 24, max_entries: int = 5000,
+                 save_every: int = 50):
+        """
+        Cache of scraped listings, least recently used first
+        path: Cache file
+        ttl_hours: Entries older than this are scraped again
+        max_entries: Least recently used entries are evicted above this size
+        save_every: Write the file after this many new entries (and on save())
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.save_every = save_every
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._unsaved = 0
+        self._load()
+
+    def _load(self):
+        """Load cached entries, dropping expired ones"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except ValueError:
+            print(f"Ignoring unreadable listing cache {self.path}")
+            return
+        now = time.time()
+        for finnkode, entry in entries.items():
+            if now - entry['fetched_at'] < self.ttl_seconds:
+                self.entries[finnkode] = entry
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries above max_entries"""
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, card: Dict) -> Optional[Dict]:
+        """
+        Cached ad-page fields for a search card, or None if the listing is new,
+        stale, or its card price differs from when it was cached
+        """
+        entry = self.entries.get(card['finnkode'])
+        if (entry is None
+                or time.time() - entry['fetched_at'] >= self.ttl_seconds
+                or entry['card_price'] != card.get('card_price')):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(card['finnkode'])
+        self.hits += 1
+        return dict(entry['data'])
+
+    def put(self, card: Dict, property_data: Dict) -> bool:
+        """
+        Cache a freshly scraped listing (incomplete or failed pages are not cached).
+        Returns True if the ad's fields changed since the previous cached fetch.
+        """
+        if 'error' in property_data or [m for m in missing_fields(property_data) if m != 'felleskostnad']:
+            return False
+
+        finnkode = card['finnkode']
+        previous = self.entries.pop(finnkode, None)
+        new_fingerprint = fingerprint(property_data)
+        self.entries[finnkode] = {
+            'fetched_at': time.time(),
+            'fingerprint': new_fingerprint,
+            'card_price': card.get('card_price'),
+            'data': {field: property_data.get(field) for field in CACHED_FIELDS},
+        }
+        self._evict()
+
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+        return previous is not None and previous['fingerprint'] != new_fingerprint
+
+    def save(self):
+        """Atomically write the cache to file"""
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
@@ -0,0 +1,99 @@
+"""
+Vectorized version of loan_calculator for many listings at once
+Every argument may be a scalar or an array (broadcast together); every output
+field of calculate_loan becomes a NumPy column. Arithmetic is done in the same
+order as the scalar functions, so results match them exactly.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+def calculate_monthly_payment_batch(principal, annual_rate, years) -> np.ndarray:
+    """Calculate monthly loan payments using PMT formula (element-wise)"""
+    principal = np.asarray(principal, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    num_payments = np.asarray(years) * 12
+
+    growth = (1 + monthly_rate) ** num_payments
+    # Rates so small that growth rounds to 1 would divide by zero; they are 0% loans in practice
+    zero_rate = (monthly_rate == 0) | (growth == 1)
+
+    # Annuity formula where the rate is non-zero, straight division where it is zero
+    annuity = np.divide(principal * (monthly_rate * growth), growth - 1,
+                        out=np.zeros(np.broadcast(principal, growth).shape), where=~zero_rate)
+    return np.where(zero_rate, principal / num_payments, annuity)
+
+
+def calculate_loan_batch(
+    property_price,
+    down_payment,
+    loan_term_years,
+    annual_interest_rate,
+    num_bedrooms,
+    num_co_owners,
+    rent_per_room,
+    total_common_costs,
+    annual_appreciation_rate,
+    eieform='Selveier',
+) -> Dict[str, np.ndarray]:
+    """Calculate loan details for your share of many properties (same fields as calculate_loan)"""
+    property_price = np.asarray(property_price, dtype=np.float64)
+    num_co_owners = np.asarray(num_co_owners)
+
+    # Add 2.5% dokumentavgift to property price, but only for selveier (not aksje or andel)
+    selveier = np.asarray(eieform) == 'Selveier'
+    dokumentavgift = np.where(selveier, property_price * 0.025, 0.0)
+    total_price_with_tax = property_price + dokumentavgift
+
+    your_property_share = total_price_with_tax / num_co_owners
+    your_loan_share = your_property_share - np.asarray(down_payment, dtype=np.float64)
+
+    monthly_payment = calculate_monthly_payment_batch(your_loan_share, annual_interest_rate, loan_term_years)
+
+    your_common_costs = np.asarray(total_common_costs, dtype=np.float64) / num_co_owners
+
+    rooms_for_rent = np.asarray(num_bedrooms) - num_co_owners
+    total_rental_income = rooms_for_rent * np.asarray(rent_per_room, dtype=np.float64)
+    your_rental_income = total_rental_income / num_co_owners
+
+    net_monthly_cost = monthly_payment + your_common_costs - your_rental_income
+
+    annual_appreciation_rate = np.asarray(annual_appreciation_rate, dtype=np.float64)
+    your_monthly_appreciation = (property_price * annual_appreciation_rate / 12) / num_co_owners
+
+    net_after_appreciation = net_monthly_cost - your_monthly_appreciation
+
+    shape = np.broadcast(dokumentavgift, monthly_payment, your_common_costs, your_rental_income,
+                         your_monthly_appreciation).shape
+    return {
+        "dokumentavgift": np.broadcast_to(dokumentavgift, shape),
+        "your_loan_share": np.broadcast_to(your_loan_share, shape),
+        "monthly_payment": np.broadcast_to(monthly_payment, shape),
+        "your_common_costs": np.broadcast_to(your_common_costs, shape),
+        "total_rental_income": np.broadcast_to(total_rental_income, shape),
+        "your_rental_income": np.broadcast_to(your_rental_income, shape),
+        "net_monthly_cost": np.broadcast_to(net_monthly_cost, shape),
+        "your_monthly_appreciation": np.broadcast_to(your_monthly_appreciation, shape),
+        "net_after_appreciation": np.broadcast_to(net_after_appreciation, shape),
+    }
+
+
+def calculate_loan_for_properties(properties, loan_params: dict) -> Dict[str, np.ndarray]:
+    """
+    Batch calculate_loan for scraped property dicts (same defaults as scrape_all:
+    felleskostnad 0 if missing, eieform 'Selveier' if missing)
+    """
+    return calculate_loan_batch(
+        property_price=np.array([p['totalpris_inkl_fellesgjeld'] for p in properties], dtype=np.float64),
+        down_payment=loan_params['down_payment'],
+        loan_term_years=loan_params['loan_term_years'],
+        annual_interest_rate=loan_params['annual_interest_rate'],
+        num_bedrooms=np.array([p['antall_soverom'] for p in properties]),
+        num_co_owners=loan_params['num_co_owners'],
+        rent_per_room=loan_params['rent_per_room'],
+        total_common_costs=np.array([p.get('felleskostnad') or 0 for p in properties], dtype=np.float64),
+        annual_appreciation_rate=loan_params['annual_appreciation_rate'],
+        eieform=np.array([p.get('eieform') or 'Selveier' for p in properties]),
+    )
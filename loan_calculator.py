@@ -1,3 +1,14 @@
+# Example loan parameters, used when my_config.py is missing
+EXAMPLE_LOAN_PARAMS = {
+    'down_payment': 500_000,  # Your down payment (egenkapital)
+    'loan_term_years': 30,
+    'annual_interest_rate': 0.05,
+    'num_co_owners': 2,
+    'rent_per_room': 6_000,
+    'annual_appreciation_rate': 0.03,
+}
+
+
 def calculate_monthly_payment(principal: float, annual_rate: float, years: int) -> float:
     """Calculate monthly loan payment using PMT formula."""
     monthly_rate = annual_rate / 12
@@ -59,6 +70,29 @@ def calculate_loan(
     }
 
 
+def calculate_loan_for_listing(listing, loan_params: dict):
+    """
+    calculate_loan for a scraped listing (dict or PropertyRecord) with LOAN_PARAMS-style parameters.
+    Returns None if the listing has no price or bedroom count.
+    """
+    if not listing.get('totalpris_inkl_fellesgjeld') or not listing.get('antall_soverom'):
+        return None
+    return calculate_loan(
+        property_price=listing['totalpris_inkl_fellesgjeld'],
+        down_payment=loan_params['down_payment'],
+        loan_term_years=loan_params['loan_term_years'],
+        annual_interest_rate=loan_params['annual_interest_rate'],
+        num_bedrooms=listing['antall_soverom'],
+        num_co_owners=loan_params['num_co_owners'],
+        rent_per_room=loan_params['rent_per_room'],
+        # Use 0 for felleskostnad if missing or None
+        total_common_costs=listing.get('felleskostnad') or 0,
+        annual_appreciation_rate=loan_params['annual_appreciation_rate'],
+        # Default to 'Selveier' if eieform is missing (conservative assumption)
+        eieform=listing.get('eieform') or 'Selveier',
+    )
+
+
 if __name__ == "__main__":
     # Example values
     result = calculate_loan(
@@ -0,0 +1,207 @@
+"""
+Monte Carlo simulation of interest-rate and appreciation paths per listing
+calculate_loan assumes one interest rate and one appreciation rate for the whole
+loan. Here both follow correlated mean-reverting paths; the floating-rate loan is
+re-amortized every month, and we report percentiles of monthly cost and equity.
+
+Rate and appreciation paths are shared by all listings (common random numbers),
+and the loan balance of a listing is its initial loan times a per-path factor,
+so each listing only costs a few array operations on top of the path simulation.
+The paths are simulated once; only the months that are reported are kept and
+handed to the worker processes.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Model parameters (annual rates; mean-reversion speeds per year)
+DEFAULT_MODEL = {
+    'rate_mean_reversion': 0.3,        # How fast the interest rate is pulled back to its long-run level
+    'rate_long_run': None,             # Long-run interest rate (None = the loan's annual_interest_rate)
+    'rate_volatility': 0.01,           # Annual standard deviation of interest rate changes
+    'appreciation_mean_reversion': 0.5,
+    'appreciation_long_run': None,     # Long-run appreciation (None = the loan's annual_appreciation_rate)
+    'appreciation_volatility': 0.04,
+    'correlation': -0.4,               # Rate shocks vs. appreciation shocks (rates up, prices down)
+}
+
+DEFAULT_HORIZONS = (12, 60, 120, 360)
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Default number of worker processes at most; per-listing work is small, so more
+# processes mostly add start-up and transfer cost
+MAX_DEFAULT_WORKERS = 4
+
+
+def simulate_paths(loan_params: dict, num_paths: int, model: dict, seed) -> Dict[str, np.ndarray]:
+    """
+    Simulate monthly paths shared by all listings (arrays of shape (paths, months [+ 1])):
+    annual_rate, payment_factor (payment / balance), balance_factor (balance / initial loan)
+    and value_factor (property value / price)
+    """
+    model = {**DEFAULT_MODEL, **model}
+    months = loan_params['loan_term_years'] * 12
+    dt = 1 / 12
+    rng = np.random.default_rng(seed)
+
+    rate_long_run = model['rate_long_run']
+    if rate_long_run is None:
+        rate_long_run = loan_params['annual_interest_rate']
+    appreciation_long_run = model['appreciation_long_run']
+    if appreciation_long_run is None:
+        appreciation_long_run = loan_params['annual_appreciation_rate']
+
+    # Correlated standard normal shocks
+    rate_shocks = rng.standard_normal((num_paths, months))
+    independent = rng.standard_normal((num_paths, months))
+    rho = model['correlation']
+    appreciation_shocks = rho * rate_shocks + np.sqrt(1 - rho ** 2) * independent
+
+    # Mean-reverting (Ornstein-Uhlenbeck) paths, interest rate floored at 0
+    annual_rate = np.empty((num_paths, months))
+    appreciation = np.empty((num_paths, months))
+    rate = np.full(num_paths, float(loan_params['annual_interest_rate']))
+    growth = np.full(num_paths, float(loan_params['annual_appreciation_rate']))
+    for t in range(months):
+        annual_rate[:, t] = rate
+        appreciation[:, t] = growth
+        rate = np.maximum(rate + model['rate_mean_reversion'] * (rate_long_run - rate) * dt
+                          + model['rate_volatility'] * np.sqrt(dt) * rate_shocks[:, t], 0)
+        growth = (growth + model['appreciation_mean_reversion'] * (appreciation_long_run - growth) * dt
+                  + model['appreciation_volatility'] * np.sqrt(dt) * appreciation_shocks[:, t])
+
+    # Payment as a share of the balance when re-amortizing over the remaining months
+    monthly_rate = annual_rate / 12
+    remaining = months - np.arange(months)
+    compound = (1 + monthly_rate) ** remaining
+    zero_rate = (monthly_rate == 0) | (compound == 1)
+    payment_factor = np.where(zero_rate, 1 / remaining,
+                              np.divide(monthly_rate * compound, compound - 1,
+                                        out=np.zeros_like(compound), where=~zero_rate))
+
+    # Balance after each month relative to the initial loan, and property value relative to price
+    balance_factor = np.ones((num_paths, months + 1))
+    np.cumprod(1 + monthly_rate - payment_factor, axis=1, out=balance_factor[:, 1:])
+    value_factor = np.ones((num_paths, months + 1))
+    np.cumprod(1 + appreciation / 12, axis=1, out=value_factor[:, 1:])
+
+    return {
+        'annual_rate': annual_rate,
+        'payment_factor': payment_factor,
+        'balance_factor': balance_factor,
+        'value_factor': value_factor,
+    }
+
+
+def horizon_columns(paths: Dict[str, np.ndarray], horizons: Sequence[int]) -> Dict[str, np.ndarray]:
+    """
+    The parts of simulate_paths' output the percentiles need, one column per horizon
+    (arrays of shape (paths, len(horizons))): payment_factor (payment in the horizon's
+    month / initial loan), balance_factor and value_factor (at the end of that month)
+    """
+    before = np.asarray(horizons) - 1
+    after = np.asarray(horizons)
+    return {
+        'payment_factor': paths['balance_factor'][:, before] * paths['payment_factor'][:, before],
+        'balance_factor': paths['balance_factor'][:, after],
+        'value_factor': paths['value_factor'][:, after],
+    }
+
+
+def _simulate_chunk(properties: List[Dict], loan_params: dict, columns: Dict[str, np.ndarray],
+                    horizons: Sequence[int], percentiles: Sequence[int]) -> List[Dict]:
+    """Percentiles of monthly cost and equity for a chunk of listings (runs in a worker process)"""
+    co_owners = loan_params['num_co_owners']
+
+    results = []
+    for prop in properties:
+        price = prop['totalpris_inkl_fellesgjeld']
+        # Same starting point as calculate_loan
+        dokumentavgift = price * 0.025 if (prop.get('eieform') or 'Selveier') == 'Selveier' else 0
+        loan = (price + dokumentavgift) / co_owners - loan_params['down_payment']
+        your_common_costs = (prop.get('felleskostnad') or 0) / co_owners
+        your_rental_income = (prop['antall_soverom'] - co_owners) * loan_params['rent_per_room'] / co_owners
+
+        by_horizon = {}
+        for i, h in enumerate(horizons):
+            payment = loan * columns['payment_factor'][:, i]
+            net_monthly_cost = payment + your_common_costs - your_rental_income
+            equity = price * columns['value_factor'][:, i] / co_owners - loan * columns['balance_factor'][:, i]
+            by_horizon[h] = {
+                'net_monthly_cost': dict(zip(percentiles, np.percentile(net_monthly_cost, percentiles).tolist())),
+                'equity': dict(zip(percentiles, np.percentile(equity, percentiles).tolist())),
+            }
+        results.append({'finnkode': prop.get('finnkode'), 'url': prop.get('url'), 'horizons': by_horizon})
+    return results
+
+
+def simulate_listings(
+    properties: List[Dict],
+    loan_params: dict,
+    num_paths: int = 10_000,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+    model: dict = None,
+    seed: int = None,
+    workers: int = None,
+) -> List[Dict]:
+    """
+    Distribution of monthly cost and equity per listing under simulated rate/appreciation paths
+    properties: Scraped listings (need totalpris_inkl_fellesgjeld and antall_soverom)
+    loan_params: LOAN_PARAMS-style dict; rates are the paths' starting points
+    horizons: Months after purchase to report (1 .. loan_term_years * 12)
+    model: Overrides for DEFAULT_MODEL
+    seed: Makes results reproducible (None = random)
+    workers: Processes to spread listings over (None = one per CPU, at most MAX_DEFAULT_WORKERS;
+             1 = no pool)
+    Returns one dict per listing: {'finnkode', 'url', 'horizons': {month: {'net_monthly_cost': {pct: value},
+    'equity': {pct: value}}}}
+    """
+    months = loan_params['loan_term_years'] * 12
+    for h in horizons:
+        if not 1 <= h <= months:
+            raise ValueError(f"Horizon {h} must be between 1 and {months} months")
+
+    # Simulated once, so all listings see the same scenarios; workers only get the reported months
+    paths = simulate_paths(loan_params, num_paths, model or {}, np.random.SeedSequence(seed))
+    columns = horizon_columns(paths, horizons)
+    del paths
+
+    workers = workers or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+    workers = min(workers, max(len(properties), 1))
+
+    if workers == 1:
+        return _simulate_chunk(properties, loan_params, columns, horizons, percentiles)
+
+    chunk_size = -(-len(properties) // workers)
+    chunks = [properties[i:i + chunk_size] for i in range(0, len(properties), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_simulate_chunk, chunk, loan_params, columns, horizons, percentiles)
+                   for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+
+
+if __name__ == "__main__":
+    # Example values
+    listings = [
+        {'finnkode': '1', 'totalpris_inkl_fellesgjeld': 5_000_000, 'antall_soverom': 4, 'felleskostnad': 4_000, 'eieform': 'Selveier'},
+    ]
+    loan_params = {
+        'down_payment': 500_000,
+        'loan_term_years': 30,
+        'annual_interest_rate': 0.05,
+        'num_co_owners': 2,
+        'rent_per_room': 6_000,
+        'annual_appreciation_rate': 0.03,
+    }
+
+    result = simulate_listings(listings, loan_params, seed=1, workers=1)[0]
+    print("=== Simulert netto månedlig kostnad og egenkapital (5% / 50% / 95%) ===\n")
+    for month, stats in result['horizons'].items():
+        cost = stats['net_monthly_cost']
+        equity = stats['equity']
+        print(f"Etter {month // 12:>2} år: kostnad {cost[5]:>8,.0f} / {cost[50]:>8,.0f} / {cost[95]:>8,.0f} kr   "
+              f"egenkapital {equity[5]:>11,.0f} / {equity[50]:>11,.0f} / {equity[95]:>11,.0f} kr")
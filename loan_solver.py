@@ -0,0 +1,247 @@
+"""
+Inverse loan calculations: the highest property price, or the lowest down payment,
+that keeps net_monthly_cost (or net_after_appreciation) within a monthly budget
+For fixed loan parameters both costs are affine in the property price and in the
+down payment (the annuity payment is proportional to the loan, dokumentavgift is a
+fixed share of the price), so two evaluations of calculate_loan give the exact
+slope and the budget is met in one step - no iteration, including the 0% rate and
+aksje/andel (no dokumentavgift) cases.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from loan_batch import calculate_loan_batch
+from loan_calculator import calculate_loan
+
+# calculate_loan fields a budget can apply to
+BUDGET_TARGETS = ('net_monthly_cost', 'net_after_appreciation')
+EIEFORMS = ('Selveier', 'Aksje', 'Andel')
+
+# Second evaluation point; any non-zero value gives the same slope
+REFERENCE_PRICE = 1_000_000.0
+
+
+def _check_target(target: str):
+    if target not in BUDGET_TARGETS:
+        raise ValueError(f"Unknown budget target {target!r}; choose from {', '.join(BUDGET_TARGETS)}")
+
+
+def max_affordable_price(monthly_budget: float, loan_params: dict, num_bedrooms: int,
+                         total_common_costs: float = 0, eieform: str = 'Selveier',
+                         target: str = 'net_monthly_cost') -> Optional[float]:
+    """
+    Highest property price whose target cost is at most monthly_budget
+    loan_params: LOAN_PARAMS-style dict
+    Returns inf if the cost falls as the price rises (appreciation outpaces the loan
+    payment), None if nothing is within budget.
+    """
+    _check_target(target)
+
+    def cost(price: float) -> float:
+        return calculate_loan(
+            property_price=price,
+            down_payment=loan_params['down_payment'],
+            loan_term_years=loan_params['loan_term_years'],
+            annual_interest_rate=loan_params['annual_interest_rate'],
+            num_bedrooms=num_bedrooms,
+            num_co_owners=loan_params['num_co_owners'],
+            rent_per_room=loan_params['rent_per_room'],
+            total_common_costs=total_common_costs,
+            annual_appreciation_rate=loan_params['annual_appreciation_rate'],
+            eieform=eieform,
+        )[target]
+
+    base = cost(0.0)
+    slope = (cost(REFERENCE_PRICE) - base) / REFERENCE_PRICE
+    if slope < 0 or (slope == 0 and base <= monthly_budget):
+        return math.inf
+    if slope == 0:
+        return None
+    price = (monthly_budget - base) / slope
+    return price if price >= 0 else None
+
+
+def required_down_payment(monthly_budget: float, property_price: float, loan_params: dict,
+                          num_bedrooms: int, total_common_costs: float = 0, eieform: str = 'Selveier',
+                          target: str = 'net_monthly_cost') -> Optional[float]:
+    """
+    Lowest down payment (your share, like loan_params['down_payment']) that keeps the
+    target cost at most monthly_budget
+    Returns 0 if no equity is needed, None if the property is over budget even
+    without any loan.
+    """
+    _check_target(target)
+
+    def cost(down_payment: float) -> float:
+        return calculate_loan(
+            property_price=property_price,
+            down_payment=down_payment,
+            loan_term_years=loan_params['loan_term_years'],
+            annual_interest_rate=loan_params['annual_interest_rate'],
+            num_bedrooms=num_bedrooms,
+            num_co_owners=loan_params['num_co_owners'],
+            rent_per_room=loan_params['rent_per_room'],
+            total_common_costs=total_common_costs,
+            annual_appreciation_rate=loan_params['annual_appreciation_rate'],
+            eieform=eieform,
+        )
+
+    base = cost(0.0)
+    # The whole property share paid up front: no loan left
+    property_share = base['your_loan_share']
+    paid_up = cost(property_share)[target]
+    base = base[target]
+    if monthly_budget < paid_up:
+        return None
+    if base <= monthly_budget or property_share <= 0:
+        return 0.0
+    # Each krone of equity lowers the payment by the same amount
+    saving = (base - paid_up) / property_share
+    return min((base - monthly_budget) / saving, property_share)
+
+
+def max_affordable_price_batch(monthly_budget, down_payment, loan_term_years, annual_interest_rate,
+                               num_bedrooms, num_co_owners, rent_per_room, total_common_costs=0.0,
+                               annual_appreciation_rate=0.0, eieform='Selveier',
+                               target: str = 'net_monthly_cost') -> np.ndarray:
+    """
+    max_affordable_price for many scenarios at once (arguments broadcast together)
+    inf where the cost falls as the price rises, nan where nothing is affordable.
+    """
+    _check_target(target)
+    params = dict(down_payment=down_payment, loan_term_years=loan_term_years,
+                  annual_interest_rate=annual_interest_rate, num_bedrooms=num_bedrooms,
+                  num_co_owners=num_co_owners, rent_per_room=rent_per_room,
+                  total_common_costs=total_common_costs, annual_appreciation_rate=annual_appreciation_rate,
+                  eieform=eieform)
+    base = calculate_loan_batch(property_price=0.0, **params)[target]
+    slope = (calculate_loan_batch(property_price=REFERENCE_PRICE, **params)[target] - base) / REFERENCE_PRICE
+
+    budget = np.asarray(monthly_budget, dtype=np.float64)
+    growing = slope > 0
+    price = np.divide(budget - base, slope, out=np.full(np.broadcast(budget, slope).shape, np.inf),
+                      where=growing)
+    # Negative prices are out of reach; so is a flat cost that starts over budget
+    return np.where((growing & (price < 0)) | ((slope == 0) & (base > budget)), np.nan, price)
+
+
+def required_down_payment_batch(monthly_budget, property_price, loan_term_years, annual_interest_rate,
+                                num_bedrooms, num_co_owners, rent_per_room, total_common_costs=0.0,
+                                annual_appreciation_rate=0.0, eieform='Selveier',
+                                target: str = 'net_monthly_cost') -> np.ndarray:
+    """
+    required_down_payment for many scenarios at once (arguments broadcast together)
+    0 where no equity is needed, nan where even no loan is over budget.
+    """
+    _check_target(target)
+    params = dict(property_price=property_price, loan_term_years=loan_term_years,
+                  annual_interest_rate=annual_interest_rate, num_bedrooms=num_bedrooms,
+                  num_co_owners=num_co_owners, rent_per_room=rent_per_room,
+                  total_common_costs=total_common_costs, annual_appreciation_rate=annual_appreciation_rate,
+                  eieform=eieform)
+    base = calculate_loan_batch(down_payment=0.0, **params)
+    property_share = base['your_loan_share']
+    paid_up = calculate_loan_batch(down_payment=property_share, **params)[target]
+    base = base[target]
+
+    budget = np.asarray(monthly_budget, dtype=np.float64)
+    saving = np.divide(base - paid_up, property_share, out=np.zeros(np.broadcast(base, paid_up).shape),
+                       where=property_share > 0)
+    needed = np.divide(base - budget, saving, out=np.zeros(np.broadcast(budget, saving).shape),
+                       where=(base > budget) & (saving > 0))
+    needed = np.minimum(needed, property_share)
+    return np.where(budget < paid_up, np.nan, needed)
+
+
+def affordability_table(monthly_budget: float, loan_params: dict, bedrooms: Sequence[int] = range(1, 7),
+                        eieforms: Sequence[str] = EIEFORMS, co_owners: Sequence[int] = None,
+                        total_common_costs: float = 0, property_price: float = None,
+                        target: str = 'net_monthly_cost') -> List[Dict]:
+    """
+    Price ceiling for every bedroom count x eieform x co-owner count, solved as one batch
+    co_owners: Co-owner counts to try (default: loan_params['num_co_owners'] only)
+    property_price: Also report the down payment needed for a property at this price
+    One dict per scenario with num_bedrooms, eieform, num_co_owners, max_price
+    (None if nothing is affordable) and, with property_price, required_down_payment.
+    """
+    if co_owners is None:
+        co_owners = [loan_params['num_co_owners']]
+    grid_bedrooms, grid_eieform, grid_co_owners = (
+        axis.ravel() for axis in np.meshgrid(np.asarray(bedrooms), np.asarray(eieforms), np.asarray(co_owners),
+                                             indexing='ij'))
+    scenario = dict(loan_term_years=loan_params['loan_term_years'],
+                    annual_interest_rate=loan_params['annual_interest_rate'],
+                    num_bedrooms=grid_bedrooms, num_co_owners=grid_co_owners,
+                    rent_per_room=loan_params['rent_per_room'], total_common_costs=total_common_costs,
+                    annual_appreciation_rate=loan_params['annual_appreciation_rate'],
+                    eieform=grid_eieform, target=target)
+
+    max_price = max_affordable_price_batch(monthly_budget, loan_params['down_payment'], **scenario)
+    columns = {'max_price': max_price}
+    if property_price is not None:
+        columns['required_down_payment'] = required_down_payment_batch(monthly_budget, property_price, **scenario)
+
+    rows = []
+    for i in range(len(grid_bedrooms)):
+        row = {'num_bedrooms': int(grid_bedrooms[i]), 'eieform': str(grid_eieform[i]),
+               'num_co_owners': int(grid_co_owners[i])}
+        for name, values in columns.items():
+            row[name] = None if np.isnan(values[i]) else float(values[i])
+        rows.append(row)
+    return rows
+
+
+def budget_max_price(max_price: Optional[int], loan_params: dict, monthly_budget: float,
+                     max_bedrooms: int = 6, target: str = 'net_monthly_cost') -> Optional[int]:
+    """
+    max_price for scrape_all that also leaves out everything over the monthly budget
+    The ceiling assumes the most favourable listing we could find: max_bedrooms
+    bedrooms to rent out, no dokumentavgift and no felleskostnad, so no affordable
+    listing with at most max_bedrooms bedrooms is ever skipped.
+    Returns the lower of max_price and that ceiling (None = no limit).
+    Raises ValueError if nothing fits the budget.
+    """
+    ceilings = max_affordable_price_batch(
+        monthly_budget,
+        down_payment=loan_params['down_payment'],
+        loan_term_years=loan_params['loan_term_years'],
+        annual_interest_rate=loan_params['annual_interest_rate'],
+        num_bedrooms=max_bedrooms,
+        num_co_owners=loan_params['num_co_owners'],
+        rent_per_room=loan_params['rent_per_room'],
+        annual_appreciation_rate=loan_params['annual_appreciation_rate'],
+        eieform=np.array(EIEFORMS),
+        target=target,
+    )
+    if np.isnan(ceilings).all():
+        raise ValueError(f"No property fits a monthly budget of {monthly_budget:,.0f} kr ({target})")
+    ceiling = np.nanmax(ceilings)
+    if np.isinf(ceiling):
+        return max_price
+    ceiling = int(ceiling)
+    return min(max_price, ceiling) if max_price else ceiling
+
+
+if __name__ == "__main__":
+    # Example values
+    loan_params = {
+        'down_payment': 500_000,
+        'loan_term_years': 30,
+        'annual_interest_rate': 0.05,
+        'num_co_owners': 2,
+        'rent_per_room': 6_000,
+        'annual_appreciation_rate': 0.03,
+    }
+    budget = 12_000
+
+    print(f"=== Høyeste pris for netto {budget:,} kr/mnd ===\n")
+    for row in affordability_table(budget, loan_params, bedrooms=range(2, 6), co_owners=[1, 2, 3],
+                                   property_price=5_000_000):
+        price = row['max_price']
+        down_payment = row['required_down_payment']
+        print(f"{row['num_bedrooms']} soverom, {row['eieform']:<8} {row['num_co_owners']} eiere: "
+              f"maks {'ingen' if price is None else f'{price:,.0f} kr':>14}, "
+              f"egenkapital for 5,000,000 kr: {'umulig' if down_payment is None else f'{down_payment:,.0f} kr'}")
@@ -0,0 +1,237 @@
+"""
+Sensitivity sweep: how listing rankings change across a grid of loan parameters
+Evaluates listings x scenarios as one broadcast computation per chunk of
+scenarios, so memory stays bounded by max_cells no matter how large the grid is.
+"""
+
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from loan_batch import calculate_loan_batch, calculate_monthly_payment_batch
+
+# Loan parameters that can be swept (same names as LOAN_PARAMS)
+SWEEP_AXES = (
+    'down_payment',
+    'loan_term_years',
+    'annual_interest_rate',
+    'num_co_owners',
+    'rent_per_room',
+    'annual_appreciation_rate',
+)
+
+
+def scenario_count(grid: Dict[str, Sequence]) -> int:
+    """Number of scenarios in the Cartesian product of the grid"""
+    return int(np.prod([len(values) for values in grid.values()], dtype=np.int64))
+
+
+def iter_scenario_chunks(grid: Dict[str, Sequence], base_params: dict,
+                         chunk_size: int) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Yield the Cartesian product of the grid in chunks of scenarios, as one array
+    per loan parameter. Parameters not in the grid are taken from base_params.
+    The full product is never materialized.
+    """
+    for name in grid:
+        if name not in SWEEP_AXES:
+            raise ValueError(f"Cannot sweep {name!r}; choose from {', '.join(SWEEP_AXES)}")
+
+    names = list(grid)
+    values = [np.asarray(grid[name]) for name in names]
+    shape = [len(v) for v in values]
+    total = scenario_count(grid)
+
+    for start in range(0, total, chunk_size):
+        count = min(chunk_size, total - start)
+        chunk = {name: np.full(count, base_params[name]) for name in SWEEP_AXES if name not in grid}
+        if names:
+            index = np.unravel_index(np.arange(start, start + count), shape)
+            for name, axis_values, axis_index in zip(names, values, index):
+                chunk[name] = axis_values[axis_index]
+        yield chunk
+
+
+def break_even_rate(principal, needed_payment, years, max_rate: float = 0.25,
+                    iterations: int = 60) -> np.ndarray:
+    """
+    Annual interest rate at which the monthly payment equals needed_payment (element-wise).
+    nan where even a 0% loan costs more, inf where even max_rate costs less.
+    """
+    principal, needed_payment, years = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(needed_payment, dtype=np.float64), np.asarray(years))
+
+    low = np.zeros(principal.shape)
+    high = np.full(principal.shape, max_rate)
+    never = needed_payment < calculate_monthly_payment_batch(principal, low, years)
+    always = needed_payment >= calculate_monthly_payment_batch(principal, high, years)
+    # With no loan left the payment does not depend on the rate
+    always |= (principal <= 0) & ~never
+
+    # The payment grows with the rate, so bisect on it
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        too_expensive = calculate_monthly_payment_batch(principal, mid, years) > needed_payment
+        high = np.where(too_expensive, mid, high)
+        low = np.where(too_expensive, low, mid)
+
+    rate = (low + high) / 2
+    rate[never] = np.nan
+    rate[always] = np.inf
+    return rate
+
+
+def _listing_columns(properties: List[Dict]) -> Dict[str, np.ndarray]:
+    """Listing fields as (listings, 1) columns, with scrape_all's defaults for missing values"""
+    return {
+        'property_price': np.array([p['totalpris_inkl_fellesgjeld'] for p in properties], dtype=np.float64)[:, None],
+        'num_bedrooms': np.array([p['antall_soverom'] for p in properties])[:, None],
+        'total_common_costs': np.array([p.get('felleskostnad') or 0 for p in properties], dtype=np.float64)[:, None],
+        'eieform': np.array([p.get('eieform') or 'Selveier' for p in properties])[:, None],
+    }
+
+
+class _RankStats:
+    """Running per-listing rank statistics"""
+
+    def __init__(self, num_listings: int, top_k: int):
+        self.top_k = top_k
+        self.scenarios = 0
+        self.rank_sum = np.zeros(num_listings)
+        self.rank_sq_sum = np.zeros(num_listings)
+        self.best = np.full(num_listings, num_listings + 1)
+        self.worst = np.zeros(num_listings, dtype=np.int64)
+        self.top1 = np.zeros(num_listings, dtype=np.int64)
+        self.top_k_count = np.zeros(num_listings, dtype=np.int64)
+        self.break_even_min = np.full(num_listings, np.inf)
+        self.break_even_max = np.full(num_listings, -np.inf)
+        self.break_even_sum = np.zeros(num_listings)
+        self.break_even_count = np.zeros(num_listings, dtype=np.int64)
+        self.break_even_scenarios = 0
+
+    def add_ranks(self, ranks: np.ndarray):
+        """ranks: (listings, scenarios), 1 = best"""
+        self.scenarios += ranks.shape[1]
+        self.rank_sum += ranks.sum(axis=1)
+        self.rank_sq_sum += (ranks.astype(np.float64) ** 2).sum(axis=1)
+        self.best = np.minimum(self.best, ranks.min(axis=1))
+        self.worst = np.maximum(self.worst, ranks.max(axis=1))
+        self.top1 += (ranks == 1).sum(axis=1)
+        self.top_k_count += (ranks <= self.top_k).sum(axis=1)
+
+    def add_break_even(self, rates: np.ndarray):
+        """rates: (listings, scenarios) from break_even_rate"""
+        self.break_even_scenarios += rates.shape[1]
+        finite = np.isfinite(rates)
+        self.break_even_min = np.minimum(self.break_even_min, np.where(finite, rates, np.inf).min(axis=1))
+        self.break_even_max = np.maximum(self.break_even_max, np.where(finite, rates, -np.inf).max(axis=1))
+        self.break_even_sum += np.where(finite, rates, 0).sum(axis=1)
+        self.break_even_count += finite.sum(axis=1)
+
+    def summary(self, properties: List[Dict]) -> List[Dict]:
+        """One dict per listing, best mean rank first"""
+        n = max(self.scenarios, 1)
+        mean_rank = self.rank_sum / n
+        rank_std = np.sqrt(np.maximum(self.rank_sq_sum / n - mean_rank ** 2, 0))
+        has_break_even = self.break_even_count > 0
+
+        rows = []
+        for i, prop in enumerate(properties):
+            rows.append({
+                'finnkode': prop.get('finnkode'),
+                'url': prop.get('url'),
+                'mean_rank': float(mean_rank[i]),
+                'rank_std': float(rank_std[i]),
+                'best_rank': int(self.best[i]),
+                'worst_rank': int(self.worst[i]),
+                'top1_share': float(self.top1[i] / n),
+                'top_k_share': float(self.top_k_count[i] / n),
+                'break_even_rate_min': float(self.break_even_min[i]) if has_break_even[i] else None,
+                'break_even_rate_mean': (float(self.break_even_sum[i] / self.break_even_count[i])
+                                         if has_break_even[i] else None),
+                'break_even_rate_max': float(self.break_even_max[i]) if has_break_even[i] else None,
+                'scenarios': self.scenarios,
+            })
+        return sorted(rows, key=lambda row: row['mean_rank'])
+
+
+def sweep_listings(
+    properties: List[Dict],
+    base_params: dict,
+    grid: Dict[str, Sequence],
+    rank_by: str = 'net_monthly_cost',
+    top_k: int = 5,
+    break_even_target: float = 0.0,
+    max_cells: int = 1_000_000,
+) -> Iterator[List[Dict]]:
+    """
+    Rank listings in every scenario of the grid and stream per-listing statistics
+    properties: Scraped listings (need totalpris_inkl_fellesgjeld and antall_soverom)
+    base_params: LOAN_PARAMS-style dict for parameters not in the grid
+    grid: Values to try per loan parameter, e.g. {'annual_interest_rate': [0.04, 0.05, 0.06]}
+    rank_by: calculate_loan field to rank on (lowest = rank 1)
+    top_k: Also report how often each listing is in the top k
+    break_even_target: Break-even rate = interest rate where net_monthly_cost equals this
+    max_cells: Listings x scenarios evaluated at once (bounds memory; ~120 MB per 1e6 cells)
+    Yields the updated summary (see _RankStats.summary) after every chunk of
+    scenarios; the last one includes break-even rates.
+    """
+    columns = _listing_columns(properties)
+    num_listings = len(properties)
+    chunk_size = max(1, max_cells // max(num_listings, 1))
+    stats = _RankStats(num_listings, top_k)
+    listing_ranks = np.arange(1, num_listings + 1)[:, None]
+
+    for chunk in iter_scenario_chunks(grid, base_params, chunk_size):
+        params = {name: values[None, :] for name, values in chunk.items()}
+        result = calculate_loan_batch(**columns, **params)
+        values = result[rank_by]
+
+        order = np.argsort(values, axis=0, kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, listing_ranks, axis=0)
+        stats.add_ranks(ranks)
+        yield stats.summary(properties)
+
+    # Break-even rates do not depend on the swept interest rate, so use the grid without it
+    rate_free_grid = {name: values for name, values in grid.items() if name != 'annual_interest_rate'}
+    for chunk in iter_scenario_chunks(rate_free_grid, base_params, chunk_size):
+        params = {name: values[None, :] for name, values in chunk.items()}
+        result = calculate_loan_batch(**columns, **params)
+        needed_payment = break_even_target - result['your_common_costs'] + result['your_rental_income']
+        stats.add_break_even(break_even_rate(result['your_loan_share'], needed_payment, params['loan_term_years']))
+
+    yield stats.summary(properties)
+
+
+if __name__ == "__main__":
+    # Example values
+    listings = [
+        {'finnkode': '1', 'totalpris_inkl_fellesgjeld': 4_200_000, 'antall_soverom': 3, 'felleskostnad': 3_500, 'eieform': 'Aksje'},
+        {'finnkode': '2', 'totalpris_inkl_fellesgjeld': 5_000_000, 'antall_soverom': 4, 'felleskostnad': 4_000, 'eieform': 'Selveier'},
+        {'finnkode': '3', 'totalpris_inkl_fellesgjeld': 3_600_000, 'antall_soverom': 2, 'felleskostnad': 2_800, 'eieform': 'Selveier'},
+    ]
+    loan_params = {
+        'down_payment': 500_000,
+        'loan_term_years': 30,
+        'annual_interest_rate': 0.05,
+        'num_co_owners': 2,
+        'rent_per_room': 6_000,
+        'annual_appreciation_rate': 0.03,
+    }
+    grid = {
+        'annual_interest_rate': np.linspace(0.03, 0.07, 41),
+        'down_payment': np.linspace(300_000, 900_000, 13),
+        'num_co_owners': [1, 2, 3],
+        'rent_per_room': [5_000, 6_000, 7_000],
+    }
+
+    for summary in sweep_listings(listings, loan_params, grid, top_k=1):
+        pass
+
+    print(f"=== Rangering over {summary[0]['scenarios']:,} scenarier ===\n")
+    for row in summary:
+        break_even = row['break_even_rate_mean']
+        print(f"Finnkode {row['finnkode']}: snittplass {row['mean_rank']:.2f} (±{row['rank_std']:.2f}), "
+              f"best i {row['top1_share']:.0%} av scenariene, "
+              f"break-even rente {'N/A' if break_even is None else f'{break_even:.2%}'}")
@@ -0,0 +1,286 @@
+"""
+Multi-profile runs: one shared crawl evaluated against several searches and loan setups
+Each profile (e.g. one group of co-owners) has its own search URL, LOAN_PARAMS,
+MAX_PRICE and ranking. Identical searches are loaded once, listings are
+de-duplicated by finnkode across all searches so every ad page is scraped once,
+and the loans for all profiles are calculated in one NumPy batch. Every profile
+gets its own ranked results file.
+
+Usage: set PROFILES in my_config.py (see README) and run python finn_scraper_selenium.py
+       (or python multi_profile.py)
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from finn_extract import card_skip_reason, search_page_url
+from ranking import RANK_KEYS, TopK
+from results_store import LOAN_COLUMNS, RESULTS_FILE, PropertyRecord, ResultsWriter
+
+REQUIRED_PROFILE_KEYS = ('name', 'search_url', 'loan_params')
+PROFILE_DEFAULTS = {'max_price': None, 'min_bedrooms': None, 'top_k': None, 'rank_by': 'net_monthly_cost',
+                    'monthly_budget': None}
+
+
+def profile_results_path(name: str) -> Path:
+    """Results file for one profile, e.g. finn_properties_kari_og_ola.jsonl"""
+    slug = re.sub(r'[^\w-]+', '_', name.strip().lower()).strip('_') or 'profile'
+    return RESULTS_FILE.with_name(f"finn_properties_{slug}.jsonl")
+
+
+def check_profiles(profiles: Sequence[Dict]) -> List[Dict]:
+    """Validate PROFILES and fill in the optional settings"""
+    checked = []
+    names = set()
+    for i, profile in enumerate(profiles, 1):
+        missing = [key for key in REQUIRED_PROFILE_KEYS if not profile.get(key)]
+        if missing:
+            raise ValueError(f"Profile {i} is missing {', '.join(missing)}")
+        if profile['name'] in names:
+            raise ValueError(f"Duplicate profile name {profile['name']!r}")
+        names.add(profile['name'])
+        profile = {**PROFILE_DEFAULTS, **profile}
+        if profile['rank_by'] not in RANK_KEYS:
+            raise ValueError(f"Profile {profile['name']!r}: unknown rank_by {profile['rank_by']!r}; "
+                             f"choose from {', '.join(RANK_KEYS)}")
+        checked.append(profile)
+    return checked
+
+
+def merge_searches(profiles: Sequence[Dict]) -> List[Dict]:
+    """
+    One entry per distinct search URL: {'search_url', 'max_price', 'profiles'}
+    max_price is the highest of its profiles' (None if any profile has no limit),
+    so paging a price-sorted search stops only once it is over every profile's budget.
+    """
+    searches: Dict[str, Dict] = {}
+    for profile in profiles:
+        key = search_page_url(profile['search_url'], 1)
+        search = searches.setdefault(key, {'search_url': profile['search_url'], 'max_price': 0, 'profiles': []})
+        search['profiles'].append(profile)
+        if search['max_price'] is not None:
+            search['max_price'] = max(search['max_price'], profile['max_price']) if profile['max_price'] else None
+    return list(searches.values())
+
+
+def _listing_key(listing) -> str:
+    finnkode = listing.get('finnkode')
+    return finnkode if finnkode and finnkode != 'unknown' else listing.get('url')
+
+
+def calculate_loans_for_profiles(pairs: Sequence[Tuple[Dict, Dict]]) -> List[Optional[Dict]]:
+    """
+    calculate_loan_for_listing for many (listing, loan_params) pairs as one NumPy batch
+    Returns one loan dict per pair (None where the listing has no price or bedroom count).
+    """
+    import numpy as np
+    from loan_batch import calculate_loan_batch
+
+    rows = [i for i, (listing, _) in enumerate(pairs)
+            if listing.get('totalpris_inkl_fellesgjeld') and listing.get('antall_soverom')]
+    loans: List[Optional[Dict]] = [None] * len(pairs)
+    if not rows:
+        return loans
+
+    listings = [pairs[i][0] for i in rows]
+    params = [pairs[i][1] for i in rows]
+
+    def param(name: str, dtype=np.float64) -> np.ndarray:
+        return np.array([p[name] for p in params], dtype=dtype)
+
+    result = calculate_loan_batch(
+        property_price=np.array([p['totalpris_inkl_fellesgjeld'] for p in listings], dtype=np.float64),
+        down_payment=param('down_payment'),
+        loan_term_years=param('loan_term_years', np.int64),
+        annual_interest_rate=param('annual_interest_rate'),
+        num_bedrooms=np.array([p['antall_soverom'] for p in listings]),
+        num_co_owners=param('num_co_owners', np.int64),
+        rent_per_room=param('rent_per_room'),
+        total_common_costs=np.array([p.get('felleskostnad') or 0 for p in listings], dtype=np.float64),
+        annual_appreciation_rate=param('annual_appreciation_rate'),
+        eieform=np.array([p.get('eieform') or 'Selveier' for p in listings]),
+    )
+    columns = {column: result[column].tolist() for column in LOAN_COLUMNS}
+    for j, i in enumerate(rows):
+        loans[i] = {column: values[j] for column, values in columns.items()}
+    return loans
+
+
+class MultiProfileRun:
+    def __init__(self, profiles: Sequence[Dict]):
+        """
+        profiles: Dicts with name, search_url and loan_params, and optionally max_price,
+                  min_bedrooms, top_k, rank_by and monthly_budget (same meaning as the single-search
+                  settings; main() turns monthly_budget into a lower max_price)
+        """
+        self.profiles = check_profiles(profiles)
+        self.searches = merge_searches(self.profiles)
+        # Listing key -> names of the profiles whose search (and card filters) include it
+        self.members: Dict[str, List[str]] = {}
+        self.stats = {'profiles': len(self.profiles), 'searches': len(self.searches), 'cards': 0,
+                      'unique_listings': 0, 'profile_listings': 0}
+
+    def iter_cards(self, scraper) -> Iterator[Dict]:
+        """Search cards from every search, each listing once, skipping listings no profile wants"""
+        for search in self.searches:
+            print(f"\nSearch for {', '.join(p['name'] for p in search['profiles'])}")
+            for card in scraper.iter_property_listings(search_url=search['search_url'],
+                                                       max_price=search['max_price']):
+                self.stats['cards'] += 1
+                wanted = [profile['name'] for profile in search['profiles']
+                          if card_skip_reason(card, profile['max_price'], profile['min_bedrooms']) is None]
+                if not wanted:
+                    print(f"  Skipping {card['finnkode']}: filtered out by every profile")
+                    continue
+
+                key = _listing_key(card)
+                members = self.members.get(key)
+                if members is None:
+                    self.members[key] = wanted
+                    self.stats['unique_listings'] += 1
+                    yield card
+                else:
+                    members.extend(name for name in wanted if name not in members)
+
+    def evaluate(self, records: Sequence[PropertyRecord]) -> Dict[str, List[PropertyRecord]]:
+        """
+        Price every scraped listing for every profile it belongs to (one batch for all profiles)
+        Returns {profile name: all of its records, best first}; listings over a profile's
+        max_price (by their ad page totalpris) are left out of that profile.
+        """
+        by_name = {profile['name']: profile for profile in self.profiles}
+        pairs: List[Tuple[PropertyRecord, Dict]] = []
+        for record in records:
+            for name in self.members.get(_listing_key(record), ()):
+                profile = by_name[name]
+                price = record.totalpris_inkl_fellesgjeld
+                if profile['max_price'] and price and price > profile['max_price']:
+                    continue
+                pairs.append((record, profile))
+
+        loans = calculate_loans_for_profiles(
+            [(record, profile['loan_params']) for record, profile in pairs])
+        self.stats['profile_listings'] = len(pairs)
+
+        rankings = {profile['name']: TopK(None, profile['rank_by']) for profile in self.profiles}
+        for (record, profile), loan in zip(pairs, loans):
+            data = record.to_dict()
+            data.pop('loan_calculation', None)
+            if loan is not None and not record.error:
+                data['loan_calculation'] = loan
+            rankings[profile['name']].push(PropertyRecord.from_property(data))
+        return {name: ranking.ranked() for name, ranking in rankings.items()}
+
+    def run(self, scraper, workers: int = 1, engine: str = 'selenium', cache=None, on_result=None,
+            host_limits: Dict = None, close_browser: bool = True) -> Dict[str, List[PropertyRecord]]:
+        """
+        Crawl all searches with one scraper, scraping each listing once, then evaluate every profile
+        scraper: FinnPropertyScraperSelenium for the search pages (and ad pages, see engine)
+        on_result: Called with each scraped listing (before any loan is calculated)
+        Other arguments as in scrape_all. Returns the same as evaluate().
+        """
+        records = scraper.scrape_all(
+            cards=self.iter_cards(scraper),
+            workers=workers,
+            engine=engine,
+            cache=cache,
+            on_result=on_result,
+            close_browser=close_browser,
+            host_limits=host_limits,
+        )
+        results = self.evaluate(records)
+        stats = self.stats
+        print(f"\n{stats['profiles']} profiles, {stats['searches']} searches: {stats['cards']} search results, "
+              f"{stats['unique_listings']} unique listings scraped, {stats['profile_listings']} profile listings priced")
+        return results
+
+    def save(self, results: Dict[str, List[PropertyRecord]]) -> Dict[str, Path]:
+        """Write each profile's records to its own results file; returns {profile name: path}"""
+        paths = {}
+        for name, records in results.items():
+            path = profile_results_path(name)
+            with ResultsWriter(path) as writer:
+                for record in records:
+                    writer.write(record)
+            paths[name] = path
+        return paths
+
+
+def print_profile_results(profile: Dict, records: List[PropertyRecord]):
+    """Short ranked list for one profile"""
+    top_k = profile['top_k']
+    shown = records[:top_k] if top_k else records
+    print("\n" + "=" * 80)
+    print(f"RESULTS for {profile['name']} ({f'top {top_k}' if top_k else 'all'} of {len(records)}, "
+          f"sorted by lowest {profile['rank_by'].replace('_', ' ')})")
+    print("=" * 80)
+    for i, record in enumerate(shown, 1):
+        price = record.totalpris_inkl_fellesgjeld
+        cost = record.net_monthly_cost
+        print(f"{i:>3}. {record.finnkode or '?':<10} "
+              f"{f'{price:,} kr' if price else 'N/A':>14}  {record.antall_soverom or '?'} soverom  "
+              f"netto {f'{cost:,.0f} kr' if cost is not None else 'N/A':>10}  {record.url}")
+
+
+def main():
+    from finn_scraper_selenium import (FinnPropertyScraperSelenium, _adaptive_rate_controller, _budget_max_price,
+                                       _config_value)
+    from listing_cache import ListingCache
+    from run_profile import PROFILE_FILE
+
+    profiles = _config_value('PROFILES', None)
+    if not profiles:
+        print("No PROFILES in my_config.py - see README")
+        return
+    try:
+        # A profile's monthly_budget lowers its max_price to what it can afford
+        profiles = [{**profile, 'max_price': _budget_max_price(profile.get('max_price'), profile['loan_params'],
+                                                               profile['monthly_budget'])}
+                    if profile.get('monthly_budget') is not None and profile.get('loan_params') else profile
+                    for profile in profiles]
+    except ValueError as e:
+        print(e)
+        return
+    run = MultiProfileRun(profiles)
+
+    cache_ttl_hours = _config_value('CACHE_TTL_HOURS', 24)
+    scraper = FinnPropertyScraperSelenium(
+        headless=False,  # Set to True to hide browser
+        debugger_address=_config_value('CHROME_DEBUGGER_ADDRESS', None),
+        block_resources=_config_value('BLOCK_RESOURCES', True),
+        block_css=_config_value('BLOCK_CSS', False),
+        rate_controller=_adaptive_rate_controller(),
+        recycle_after_pages=_config_value('RECYCLE_AFTER_PAGES', 300),
+        recycle_above_mb=_config_value('RECYCLE_ABOVE_MB', 1500),
+    )
+    # The shared crawl (without loans) goes to the usual results file; rerank.py can price it again
+    writer = ResultsWriter(RESULTS_FILE)
+
+    try:
+        results = run.run(
+            scraper,
+            workers=_config_value('WORKERS', 1),
+            engine=_config_value('ENGINE', 'selenium'),
+            cache=ListingCache(ttl_hours=cache_ttl_hours) if cache_ttl_hours else None,
+            on_result=writer.write,
+            host_limits=_config_value('HOST_LIMITS', None),
+        )
+        paths = run.save(results)
+        for profile in run.profiles:
+            print_profile_results(profile, results[profile['name']])
+            print(f"Results saved to {paths[profile['name']]}")
+        print(f"\nAll scraped listings saved to {RESULTS_FILE}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        writer.close()
+        scraper.close()
+        scraper.profile.print_summary()
+        scraper.profile.save(PROFILE_FILE)
+        print(f"Run profile appended to {PROFILE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
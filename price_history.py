@@ -0,0 +1,227 @@
+"""
+Price history storage for finn.no listings
+Keeps a compacted JSON snapshot (price_history.json) plus an append-only log of
+changes, so a run loads the history once and only appends what changed.
+Log entries are numbered and the snapshot stores the last number it contains, so a
+log left behind by a crash during compaction is not applied twice.
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from finn_extract import extract_finnkode
+
+# File to store price history
+PRICE_HISTORY_FILE = Path(__file__).parent / "price_history.json"
+
+# Rewrite the snapshot after this many appended log entries
+COMPACT_EVERY = 500
+
+# Snapshot layout: {'format': SNAPSHOT_FORMAT, 'log_seq': last log entry it includes,
+# 'listings': {finnkode: {'url', 'prices'}}}. The older plain {finnkode: ...} file is still read.
+SNAPSHOT_FORMAT = 2
+
+
+class PriceHistoryStore:
+    def __init__(self, path: Path = PRICE_HISTORY_FILE, compact_every: int = COMPACT_EVERY):
+        """
+        Price history indexed by finnkode
+        path: Snapshot file (see SNAPSHOT_FORMAT; an old plain price_history.json is imported as-is)
+        compact_every: Number of log entries before the snapshot is rewritten
+        """
+        self.path = Path(path)
+        self.log_path = self.path.with_suffix('.log')
+        self.compact_every = compact_every
+        self.history: Dict = {}
+        self._log_file = None
+        self._log_entries = 0
+        # Number of the last log entry applied
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Load the snapshot and replay any log entries written after it"""
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('format') == SNAPSHOT_FORMAT:
+                self.history = snapshot['listings']
+                self._seq = snapshot['log_seq']
+            else:
+                # Plain {finnkode: history} file from before the snapshot was versioned
+                # (briefly with its log number under '_log_seq')
+                self._seq = snapshot.pop('_log_seq', 0)
+                self.history = snapshot
+
+        if self.log_path.exists():
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Partial line from a run that crashed mid-write
+                        continue
+                    seq = entry.get('seq')
+                    if seq is not None:
+                        if seq <= self._seq:
+                            # Already in the snapshot (crash between snapshot rewrite and log removal)
+                            continue
+                        self._seq = seq
+                    self._apply(entry)
+                    self._log_entries += 1
+
+    def _apply(self, entry: Dict):
+        """Apply a single log entry to the in-memory history"""
+        prop_history = self.history.setdefault(entry['finnkode'], {'url': entry['url'], 'prices': []})
+        prop_history['url'] = entry['url']
+        if entry.get('price') is not None:
+            prop_history['prices'].append({
+                'date': entry['date'],
+                'price': entry['price']
+            })
+
+    def _append(self, entry: Dict):
+        """Apply an entry and append it to the log"""
+        self._seq += 1
+        entry['seq'] = self._seq
+        self._apply(entry)
+        if self._log_file is None:
+            self._log_file = open(self.log_path, 'a', encoding='utf-8')
+        self._log_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._log_file.flush()
+        self._log_entries += 1
+        if self._log_entries >= self.compact_every:
+            self._compact()
+
+    def get(self, finnkode: str) -> Optional[Dict]:
+        """Return the stored history for a finnkode, or None"""
+        return self.history.get(finnkode)
+
+    def record_price(self, finnkode: str, url: str, current_price: int) -> Dict:
+        """
+        Record the current price for a property and return price change info.
+        Returns dict with 'previous_prices' list and 'price_change' if changed.
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        with self._lock:
+            prop_history = self.history.get(finnkode)
+            previous_prices = prop_history['prices'] if prop_history else []
+
+            # Check if price has changed since last record
+            price_change = None
+            if previous_prices:
+                last_price = previous_prices[-1]['price']
+                if last_price != current_price:
+                    price_change = current_price - last_price
+                    # Add new price record
+                    self._append({'finnkode': finnkode, 'url': url, 'date': today, 'price': current_price})
+                elif prop_history['url'] != url:
+                    # Update URL in case it changed
+                    self._append({'finnkode': finnkode, 'url': url})
+            else:
+                # First time seeing this property
+                self._append({'finnkode': finnkode, 'url': url, 'date': today, 'price': current_price})
+
+            return {
+                'previous_prices': list(self.history[finnkode]['prices']),
+                'price_change': price_change
+            }
+
+    def _compact(self):
+        """Atomically rewrite the snapshot and truncate the log"""
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            snapshot = {'format': SNAPSHOT_FORMAT, 'log_seq': self._seq, 'listings': self.history}
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        if self.log_path.exists():
+            self.log_path.unlink()
+        self._log_entries = 0
+
+    def compact(self):
+        """Rewrite the snapshot now"""
+        with self._lock:
+            self._compact()
+
+    def replace(self, history: Dict):
+        """Replace the whole history and write it out"""
+        with self._lock:
+            self.history = history
+            self._compact()
+
+    def close(self):
+        """Compact pending log entries and close the log file"""
+        with self._lock:
+            if self._log_entries:
+                self._compact()
+            elif self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+
+_default_store: Optional[PriceHistoryStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_price_history_store() -> PriceHistoryStore:
+    """Return the price history store for this run, loading it on first use (once, even from many threads)"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                store = PriceHistoryStore(PRICE_HISTORY_FILE)
+                atexit.register(store.close)
+                _default_store = store
+    return _default_store
+
+
+def load_price_history() -> Dict:
+    """Load price history (snapshot plus log)"""
+    return get_price_history_store().history
+
+
+def save_price_history(history: Dict):
+    """Save price history to file"""
+    get_price_history_store().replace(history)
+
+
+def update_price_history(url: str, current_price: int) -> Dict:
+    """
+    Update price history for a property and return price change info.
+    Returns dict with 'previous_prices' list and 'price_change' if changed.
+    """
+    if not current_price:
+        return {'previous_prices': [], 'price_change': None}
+
+    finnkode = extract_finnkode(url)
+    if not finnkode:
+        return {'previous_prices': [], 'price_change': None}
+
+    return get_price_history_store().record_price(finnkode, url, current_price)
+
+
+def attach_price_history(property_data: Dict) -> Dict:
+    """Track price history for a scraped property and add it to property_data"""
+    price_info = update_price_history(property_data['url'], property_data['totalpris_inkl_fellesgjeld'])
+    property_data['previous_prices'] = price_info['previous_prices']
+    property_data['price_change'] = price_info['price_change']
+
+    if price_info['price_change']:
+        change = price_info['price_change']
+        direction = "↓" if change < 0 else "↑"
+        print(f"  PRICE CHANGE: {direction} {abs(change):,} kr")
+
+    return property_data
@@ -0,0 +1,74 @@
+"""
+Streaming top-K ranking of scraped listings
+Keeps only the K best listings seen so far in a sorted list, so a long crawl can
+show partial results as listings arrive without holding every record in memory.
+"""
+
+import bisect
+import itertools
+from typing import Callable, Dict, List, Optional
+
+from results_store import PropertyRecord
+
+
+def _price_per_bedroom(record: PropertyRecord) -> Optional[float]:
+    if not record.totalpris_inkl_fellesgjeld or not record.antall_soverom:
+        return None
+    return record.totalpris_inkl_fellesgjeld / record.antall_soverom
+
+
+# Ranking keys (lowest value = best)
+RANK_KEYS: Dict[str, Callable[[PropertyRecord], Optional[float]]] = {
+    'net_monthly_cost': lambda record: record.net_monthly_cost,
+    'net_after_appreciation': lambda record: record.net_after_appreciation,
+    'price_per_bedroom': _price_per_bedroom,
+}
+
+
+class TopK:
+    def __init__(self, k: Optional[int] = None, rank_by: str = 'net_monthly_cost'):
+        """
+        Bounded ranking of the best listings
+        k: Number of listings to keep (None = keep all)
+        rank_by: Key from RANK_KEYS; listings without a value rank last
+        """
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"Unknown ranking key {rank_by!r}; choose from {', '.join(RANK_KEYS)}")
+        if k is not None and k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self.rank_by = rank_by
+        self._key = RANK_KEYS[rank_by]
+        self._counter = itertools.count()
+        # Entries are (value, arrival, record), best first; on equal values the
+        # later arrival counts as worse (arrivals are unique, so records are never compared)
+        self._entries = []
+        self.seen = 0
+
+    def value(self, record: PropertyRecord) -> float:
+        """Ranking value of a record (inf when it cannot be ranked)"""
+        value = self._key(record)
+        return float('inf') if value is None else value
+
+    def push(self, record: PropertyRecord) -> Optional[int]:
+        """
+        Offer a listing to the ranking
+        Returns its 1-based rank if it made the top K, otherwise None
+        """
+        self.seen += 1
+        entry = (self.value(record), next(self._counter), record)
+        if self.k is not None and len(self._entries) >= self.k and entry >= self._entries[-1]:
+            return None
+        # Binary search for the rank; the insert itself is a single list memmove
+        rank = bisect.bisect_right(self._entries, entry)
+        self._entries.insert(rank, entry)
+        if self.k is not None and len(self._entries) > self.k:
+            self._entries.pop()
+        return rank + 1
+
+    def ranked(self) -> List[PropertyRecord]:
+        """Kept listings, best first"""
+        return [entry[2] for entry in self._entries]
+
+    def __len__(self):
+        return len(self._entries)
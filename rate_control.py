@@ -0,0 +1,293 @@
+"""
+Request pacing shared by all scraper workers
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# What happened to one ad page request (AdaptiveRateController.record)
+OUTCOMES = ('success', 'blocked', 'timeout', 'incomplete', 'error')
+# Outcomes that mean finn.no wants us to slow down
+BACKOFF_OUTCOMES = ('blocked', 'timeout', 'incomplete')
+
+
+class RateLimiter:
+    def __init__(self, min_interval: float = 1.0):
+        """
+        Global politeness limit: at most one request every min_interval seconds,
+        no matter how many workers are asking.
+        """
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the caller may send its next request"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveTimeout:
+    def __init__(self, initial: float = 5.0, min_timeout: float = 2.0, max_timeout: float = 20.0):
+        """
+        Timeout that follows how long pages actually take to become ready.
+        Uses a smoothed mean and deviation of observed load times (like TCP's
+        retransmission timer), so fast sites get short waits and slow periods
+        get longer ones, always between min_timeout and max_timeout.
+        """
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.mean = None
+        self.deviation = 0.0
+
+    @property
+    def timeout(self) -> float:
+        """Current timeout in seconds"""
+        if self.mean is None:
+            return self.initial
+        return min(self.max_timeout, max(self.min_timeout, self.mean + 4 * self.deviation))
+
+    def observe(self, seconds: float):
+        """Record how long a page took to become ready"""
+        if self.mean is None:
+            self.mean = seconds
+            self.deviation = seconds / 2
+        else:
+            self.deviation = 0.75 * self.deviation + 0.25 * abs(seconds - self.mean)
+            self.mean = 0.875 * self.mean + 0.125 * seconds
+
+
+def classify_result(property_data: Dict) -> str:
+    """Outcome of a scraped ad page (one of OUTCOMES), judged from scrape_property's dict"""
+    error = property_data.get('error')
+    if error:
+        error = error.lower()
+        if error.startswith('redirected') or 'blocked' in error or error in ('http 403', 'http 429'):
+            return 'blocked'
+        if 'timeout' in error or 'timed out' in error:
+            return 'timeout'
+        return 'error'
+    if not property_data.get('totalpris_inkl_fellesgjeld') or not property_data.get('antall_soverom'):
+        return 'incomplete'
+    return 'success'
+
+
+class AdaptiveRateController:
+    def __init__(self, initial_rate: float = 1.0, min_rate: float = 0.1, max_rate: float = 4.0,
+                 increase: float = 0.05, backoff: float = 0.5, window: int = 100, max_error_rate: float = 0.1,
+                 block_threshold: int = 3, cooldown: float = 60.0, max_cooldown: float = 900.0,
+                 recovery: float = 5.0, probe_timeout: float = 120.0):
+        """
+        Request pacing that looks for the highest rate finn.no tolerates, instead of a fixed interval.
+        The rate grows additively while pages succeed and is cut multiplicatively on blocks,
+        timeouts and incomplete pages (AIMD, like TCP congestion control); close to the rate
+        where blocks last started it grows ten times slower. Repeated blocks open
+        a circuit breaker: no requests until the cooldown is over, then one probe at min_rate
+        (everyone else waits for its outcome), and if it succeeds the rate resumes at half of
+        what it was when the blocks started.
+        Drop-in for RateLimiter (wait()); scrapers report each request with record(), exactly
+        once per wait(). Outcomes of requests sent before the circuit last opened don't move
+        the circuit or the rate.
+        initial_rate: Requests per second to start with
+        min_rate / max_rate: Bounds for the rate (requests per second)
+        increase: Requests per second added after each successful page while error budget is left
+        backoff: Rate multiplier after a block, timeout or incomplete page
+        window: Number of recent requests the error rate is measured over
+        max_error_rate: Share of failed requests in the window that uses up the error budget
+        block_threshold: Blocks in a row that open the circuit breaker
+        cooldown: Seconds the circuit stays open the first time (doubles on every re-open, up to max_cooldown)
+        recovery: Seconds after a backoff in which further failures don't cut the rate again
+                  (they are usually requests that were already under way)
+        probe_timeout: Seconds after which a probe that was never recorded is given up on and
+                       the next request probes instead
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.max_error_rate = max_error_rate
+        self.block_threshold = block_threshold
+        self.initial_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.recovery = recovery
+        self.probe_timeout = probe_timeout
+
+        self.state = 'closed'  # 'open' while cooling down, 'half_open' while the probe is out
+        self.trips = 0
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self._rate = min(max_rate, max(min_rate, initial_rate))
+        self._failures = deque(maxlen=window)
+        self._consecutive_blocks = 0
+        self._rate_before_blocks = self._rate
+        self._resume_rate = self._rate
+        # Rate at which the last blocks started; growth slows down near it
+        self._ceiling = None
+        self._last_backoff = float('-inf')
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        # Bumped every time the circuit opens; requests are tagged with the epoch they were sent in
+        self._epoch = 0
+        self._next_slot = 0.0
+        self._probe_out = False
+        self._probe_deadline = 0.0
+        self._lock = threading.Lock()
+        # Notified when the probe is answered
+        self._probe_answered = threading.Condition(self._lock)
+        self._local = threading.local()
+
+    @property
+    def rate(self) -> float:
+        """Current rate in requests per second"""
+        return self._rate
+
+    @property
+    def interval(self) -> float:
+        """Current seconds between requests"""
+        return 1 / self._rate
+
+    @property
+    def error_rate(self) -> float:
+        """Share of failed requests among the last `window`"""
+        if not self._failures:
+            return 0.0
+        return sum(self._failures) / len(self._failures)
+
+    @property
+    def error_budget(self) -> float:
+        """Share of the error budget left (1 = no recent failures, 0 = used up; the rate stops growing)"""
+        return max(0.0, 1 - self.error_rate / self.max_error_rate)
+
+    def _wait_for_probe(self):
+        """Block while the probe is out, until record() answers it or it times out (lock held)"""
+        while self._probe_out:
+            remaining = self._probe_deadline - time.monotonic()
+            if remaining <= 0:
+                print("Circuit probe was never answered, sending another")
+                self._probe_out = False
+                return
+            self._probe_answered.wait(remaining)
+
+    def _reserve_slot(self) -> int:
+        """Sleep until the next free slot after any cooldown and probe; returns its epoch with the lock held"""
+        while True:
+            with self._lock:
+                self._wait_for_probe()
+                now = time.monotonic()
+                slot = max(now, self._next_slot, self._open_until)
+                self._next_slot = slot + self.interval
+                epoch = self._epoch
+            delay = slot - now
+            if delay > 0:
+                time.sleep(delay)
+            self._lock.acquire()
+            if self._epoch == epoch and not self._probe_out:
+                return epoch
+            # The circuit opened or another request became the probe while we slept; queue again
+            self._lock.release()
+
+    def wait(self) -> int:
+        """
+        Block until the caller may send its next request (also while the circuit is open)
+        Returns the circuit epoch of the request; record() picks it up in the same thread.
+        """
+        epoch = self._reserve_slot()
+        try:
+            if self.state != 'closed':
+                # The cooldown is over (the slot is past it) and no probe is out: this request is the probe
+                self.state = 'half_open'
+                self._probe_out = True
+                self._probe_deadline = time.monotonic() + self.probe_timeout
+            self._local.epoch = epoch
+        finally:
+            self._lock.release()
+        return epoch
+
+    def pace(self):
+        """
+        Block like wait() for a load that is not recorded on its own, e.g. the browser retry
+        of a page whose fast attempt was already recorded. Keeps to the rate, the cooldown and
+        the probe but is never the probe itself.
+        """
+        self._reserve_slot()
+        self._lock.release()
+
+    def record(self, outcome: str, epoch: Optional[int] = None):
+        """
+        Adjust the rate after one request; outcome is one of OUTCOMES (see classify_result)
+        epoch: What wait() returned for the request (default: this thread's last wait())
+        """
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Unknown outcome {outcome!r}; choose from {', '.join(OUTCOMES)}")
+        if epoch is None:
+            epoch = getattr(self._local, 'epoch', None)
+        self._local.epoch = None
+        with self._lock:
+            self.counts[outcome] += 1
+            self._failures.append(outcome != 'success')
+            if epoch is not None and epoch != self._epoch:
+                # Sent before the circuit last opened: neither a probe result nor news about the current rate
+                return
+            if self.state == 'half_open':
+                # Nothing else is sent while the probe is out, so this is its outcome. On a timeout or
+                # incomplete page the circuit stays half open and the next request probes again.
+                self._probe_out = False
+                self._probe_answered.notify_all()
+
+            if outcome == 'success':
+                self._consecutive_blocks = 0
+                if self.state == 'half_open':
+                    print("Circuit closed: requests succeed again")
+                    self.state = 'closed'
+                    self._cooldown = self.initial_cooldown
+                    self._rate = self._resume_rate
+                if self.error_budget > 0:
+                    near_ceiling = self._ceiling is not None and self._rate >= self._ceiling * 0.8
+                    increase = self.increase / 10 if near_ceiling else self.increase
+                    self._rate = min(self.max_rate, self._rate + increase)
+                return
+
+            if outcome == 'blocked':
+                if self._consecutive_blocks == 0:
+                    self._rate_before_blocks = self._rate
+                    self._ceiling = self._rate
+                self._consecutive_blocks += 1
+            now = time.monotonic()
+            if outcome in BACKOFF_OUTCOMES and now - self._last_backoff >= self.recovery:
+                self._rate = max(self.min_rate, self._rate * self.backoff)
+                self._last_backoff = now
+            if outcome == 'blocked':
+                if self.state == 'half_open' or self._consecutive_blocks >= self.block_threshold:
+                    self._open_circuit()
+
+    def _open_circuit(self):
+        """Pause all requests for the cooldown, then start again slowly (lock held)"""
+        self.trips += 1
+        self._epoch += 1
+        self.state = 'open'
+        self._open_until = time.monotonic() + self._cooldown
+        print(f"Circuit open: {self._consecutive_blocks} blocked requests, pausing for {self._cooldown:.0f} s")
+        self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+        self._consecutive_blocks = 0
+        self._resume_rate = max(self.min_rate, self._rate_before_blocks * self.backoff)
+        self._rate = self.min_rate
+        self._last_backoff = float('-inf')
+
+    def stats(self) -> Dict:
+        """Current rate, error budget, circuit state and request outcomes"""
+        return {
+            'rate': self.rate,
+            'listings_per_minute': self.rate * 60,
+            'error_rate': self.error_rate,
+            'error_budget': self.error_budget,
+            'state': self.state,
+            'circuit_trips': self.trips,
+            **self.counts,
+        }
@@ -0,0 +1,108 @@
+"""
+Re-price and re-rank saved scrape results without a browser
+Reads finn_properties_selenium.jsonl (or an old finn_properties_selenium.json),
+recalculates every listing with calculate_loan using LOAN_PARAMS from my_config.py
+(optionally overridden on the command line) and prints the new ranking.
+Imports neither Selenium nor NumPy, so it starts in a few tens of milliseconds.
+
+Usage: python rerank.py [results file] [--rate 0.055] [--down-payment 600000]
+                        [--co-owners 3] [--rent 6500] [--top 20] [--rank-by net_after_appreciation]
+                        [--output reranked.jsonl]
+"""
+
+import argparse
+from typing import Dict, List
+
+from loan_calculator import EXAMPLE_LOAN_PARAMS, calculate_loan_for_listing
+from ranking import RANK_KEYS, TopK
+from results_store import LOAN_COLUMNS, RESULTS_FILE, PropertyRecord, ResultsWriter, iter_records
+
+# Command line options that override LOAN_PARAMS
+OVERRIDES = {
+    'rate': 'annual_interest_rate',
+    'down_payment': 'down_payment',
+    'co_owners': 'num_co_owners',
+    'rent': 'rent_per_room',
+    'appreciation': 'annual_appreciation_rate',
+    'years': 'loan_term_years',
+}
+
+
+def load_loan_params() -> Dict:
+    """LOAN_PARAMS from my_config.py, or the example values"""
+    try:
+        from my_config import LOAN_PARAMS
+        return dict(LOAN_PARAMS)
+    except ImportError:
+        print("my_config.py not found - using example loan parameters")
+        return dict(EXAMPLE_LOAN_PARAMS)
+
+
+def reprice(record: PropertyRecord, loan_params: Dict) -> PropertyRecord:
+    """Replace a record's loan fields with a fresh calculation"""
+    loan = calculate_loan_for_listing(record, loan_params) or {}
+    for column in LOAN_COLUMNS:
+        setattr(record, column, loan.get(column))
+    return record
+
+
+def rerank(path, loan_params: Dict, top_k: int = None, rank_by: str = 'net_monthly_cost',
+           output=None) -> List[PropertyRecord]:
+    """
+    Re-price every saved listing and return the best top_k (all if None), best first
+    output: Also write all re-priced records to this results file
+    """
+    ranking = TopK(top_k, rank_by)
+    writer = ResultsWriter(output) if output else None
+    try:
+        for record in iter_records(path):
+            if record.error:
+                continue
+            reprice(record, loan_params)
+            if writer is not None:
+                writer.write(record)
+            ranking.push(record)
+    finally:
+        if writer is not None:
+            writer.close()
+    return ranking.ranked()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-price and re-rank saved finn.no results")
+    parser.add_argument('path', nargs='?', default=str(RESULTS_FILE), help='Results file (.jsonl or old .json)')
+    parser.add_argument('--rate', type=float, help='Annual interest rate, e.g. 0.055')
+    parser.add_argument('--down-payment', type=float, help='Your down payment (egenkapital)')
+    parser.add_argument('--co-owners', type=int, help='Number of co-owners')
+    parser.add_argument('--rent', type=float, help='Rent per room per month')
+    parser.add_argument('--appreciation', type=float, help='Annual appreciation, e.g. 0.03')
+    parser.add_argument('--years', type=int, help='Loan term in years')
+    parser.add_argument('--top', type=int, help='Only show the best N listings')
+    parser.add_argument('--rank-by', default='net_monthly_cost', choices=list(RANK_KEYS))
+    parser.add_argument('--output', help='Write the re-priced results to this file')
+    args = parser.parse_args()
+
+    loan_params = load_loan_params()
+    for option, param in OVERRIDES.items():
+        value = getattr(args, option)
+        if value is not None:
+            loan_params[param] = value
+
+    records = rerank(args.path, loan_params, top_k=args.top, rank_by=args.rank_by, output=args.output)
+
+    print(f"Rente {loan_params['annual_interest_rate']:.2%}, egenkapital {loan_params['down_payment']:,.0f} kr, "
+          f"{loan_params['num_co_owners']} medeiere, leie {loan_params['rent_per_room']:,.0f} kr/rom\n")
+    for i, record in enumerate(records, 1):
+        price = record.totalpris_inkl_fellesgjeld
+        cost = record.net_monthly_cost
+        after = record.net_after_appreciation
+        print(f"{i:>3}. {record.finnkode or '?':<10} "
+              f"{f'{price:,} kr' if price else 'N/A':>14}  {record.antall_soverom or '?'} soverom  "
+              f"netto {f'{cost:,.0f} kr' if cost is not None else 'N/A':>10}  "
+              f"etter verdistigning {f'{after:,.0f} kr' if after is not None else 'N/A':>10}  {record.url}")
+    if args.output:
+        print(f"\nRe-priced results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Memory use of a process and everything it started (e.g. ChromeDriver and its Chrome processes)
+Uses psutil when it is installed and falls back to /proc on Linux; elsewhere the
+memory use is unknown (None) and only page-count limits apply.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _proc_parents() -> Dict[int, List[int]]:
+    """Parent pid -> child pids, from /proc/<pid>/stat"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; fields after it are plain
+        parent = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(parent, []).append(int(entry))
+    return children
+
+
+def _proc_rss(pid: int) -> int:
+    """Resident memory of one process in bytes (0 if it is gone)"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident memory of pid and all its descendants in bytes, or None if it cannot be measured"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass  # Exited while we were counting
+        return total
+
+    if not os.path.exists(f'/proc/{pid}/statm'):
+        return None
+    children = _proc_parents()
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss(current)
+        pending.extend(children.get(current, ()))
+    return total
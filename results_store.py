@@ -0,0 +1,213 @@
+"""
+Compact, typed storage for scrape results
+Each listing is a flat PropertyRecord (__slots__, loan fields as plain columns,
+price history as a list of {'date', 'price'} in one column) and is appended to a JSON Lines file as soon as it is finished: a header line
+with the column names, then one JSON array per listing. A crash keeps every
+finished row, and readers can keep just the columns they need.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Results file written by main()
+RESULTS_FILE = Path('finn_properties_selenium.jsonl')
+
+PROPERTY_COLUMNS = (
+    'finnkode',
+    'url',
+    'totalpris_inkl_fellesgjeld',
+    'antall_soverom',
+    'felleskostnad',
+    'eieform',
+    'price_change',
+    'previous_prices',
+    'from_cache',
+    'error',
+)
+
+# Fields returned by calculate_loan
+LOAN_COLUMNS = (
+    'dokumentavgift',
+    'your_loan_share',
+    'monthly_payment',
+    'your_common_costs',
+    'total_rental_income',
+    'your_rental_income',
+    'net_monthly_cost',
+    'your_monthly_appreciation',
+    'net_after_appreciation',
+)
+
+COLUMNS = PROPERTY_COLUMNS + LOAN_COLUMNS
+
+# Column types (None values become NaN / empty in typed arrays)
+COLUMN_TYPES = {
+    'finnkode': str,
+    'url': str,
+    'totalpris_inkl_fellesgjeld': int,
+    'antall_soverom': int,
+    'felleskostnad': int,
+    'eieform': str,
+    'price_change': int,
+    'previous_prices': list,
+    'from_cache': bool,
+    'error': str,
+    **{column: float for column in LOAN_COLUMNS},
+}
+
+_MISSING = object()
+
+
+class PropertyRecord:
+    """One scraped listing with its loan calculation, as flat typed fields"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, **fields):
+        for column in self.__slots__:
+            setattr(self, column, fields.get(column))
+
+    @classmethod
+    def from_property(cls, data: Dict) -> 'PropertyRecord':
+        """Build a record from scrape_property's dict (with optional 'loan_calculation')"""
+        return cls(**data, **(data.get('loan_calculation') or {}))
+
+    @classmethod
+    def from_row(cls, columns: Sequence[str], row: Sequence) -> 'PropertyRecord':
+        """Build a record from a stored row"""
+        return cls(**dict(zip(columns, row)))
+
+    def to_row(self) -> list:
+        """Values in COLUMNS order"""
+        return [getattr(self, column) for column in COLUMNS]
+
+    @property
+    def loan_calculation(self) -> Optional[Dict]:
+        """calculate_loan's result dict, or None if no loan was calculated"""
+        if self.net_monthly_cost is None:
+            return None
+        return {column: getattr(self, column) for column in LOAN_COLUMNS}
+
+    def to_dict(self) -> Dict:
+        """Same nested dict shape as scrape_property + loan_calculation"""
+        data = {column: getattr(self, column) for column in PROPERTY_COLUMNS if getattr(self, column) is not None}
+        # Files written before previous_prices was stored have none
+        data['previous_prices'] = self.previous_prices or []
+        loan = self.loan_calculation
+        if loan:
+            data['loan_calculation'] = loan
+        return data
+
+    # Dict-style access so code written for the old result dicts keeps working
+    def get(self, key: str, default=None):
+        if key == 'loan_calculation':
+            return self.loan_calculation
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self):
+        return f"PropertyRecord(finnkode={self.finnkode!r}, totalpris={self.totalpris_inkl_fellesgjeld!r})"
+
+
+class ResultsWriter:
+    def __init__(self, path: Path = RESULTS_FILE):
+        """
+        Append records to a JSON Lines results file as they are finished
+        path: Results file (overwritten)
+        """
+        self.path = Path(path)
+        self.count = 0
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps({'columns': list(COLUMNS)}) + '\n')
+        self._file.flush()
+
+    def write(self, record: PropertyRecord):
+        """Write one record and flush it to disk"""
+        self._file.write(json.dumps(record.to_row(), ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(path: Path = RESULTS_FILE) -> Iterator[PropertyRecord]:
+    """
+    Read records one at a time from a results file. Also reads the old
+    finn_properties_selenium.json format (a JSON list of nested dicts).
+    """
+    path = Path(path)
+    if path.suffix == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            for data in json.load(f):
+                yield PropertyRecord.from_property(data)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        columns = json.loads(f.readline())['columns']
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Partial last line from a run that crashed mid-write
+                continue
+            yield PropertyRecord.from_row(columns, row)
+
+
+def load_results(path: Path = RESULTS_FILE, columns: Sequence[str] = None) -> Dict[str, list]:
+    """Load a results file as {column: list of values}, keeping only the requested columns"""
+    columns = list(columns or COLUMNS)
+    data = {column: [] for column in columns}
+    for record in iter_records(path):
+        for column in columns:
+            data[column].append(getattr(record, column))
+    return data
+
+
+def to_structured_array(data: Dict[str, list]):
+    """Convert load_results output to a NumPy structured array (missing numbers become NaN)"""
+    import numpy as np
+
+    dtypes = []
+    arrays = []
+    for column, values in data.items():
+        kind = COLUMN_TYPES.get(column, str)
+        if kind in (int, float):
+            dtypes.append((column, np.float64))
+            arrays.append([np.nan if v is None else v for v in values])
+        elif kind is bool:
+            dtypes.append((column, np.bool_))
+            arrays.append([bool(v) for v in values])
+        else:
+            dtypes.append((column, object))
+            # One element at a time, so lists (previous_prices) are not turned into an extra dimension
+            objects = np.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                objects[i] = value
+            arrays.append(objects)
+
+    result = np.empty(len(arrays[0]) if arrays else 0, dtype=dtypes)
+    for (column, _), values in zip(dtypes, arrays):
+        result[column] = values
+    return result
+
+
+def load_records(path: Path = RESULTS_FILE) -> List[PropertyRecord]:
+    """Load all records of a results file"""
+    return list(iter_records(path))
@@ -0,0 +1,105 @@
+"""
+Per-run timing and counter instrumentation
+Scrapers record how long each phase takes (driver startup, page loads, cookie
+popup, extraction strategies, price history I/O, ...) and count events such as
+retries and blocked redirects. At the end of a run the summary (p50/p95 per
+phase) is appended to a JSON Lines file, one line per run, so runs can be
+compared over time.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+# One summary line per run
+PROFILE_FILE = Path('finn_profile.jsonl')
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Percentile of already sorted values (linear interpolation, like numpy's default)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def distribution(values: List[float]) -> Dict:
+    """count, total, p50, p95 and max of a list of samples"""
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'total': sum(ordered),
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'max': ordered[-1] if ordered else 0.0,
+    }
+
+
+class RunProfile:
+    def __init__(self):
+        """Timings, counters and per-listing values for one run (shared by all worker threads)"""
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = {}
+        self.values: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one sample of `name` (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_timing(name, time.perf_counter() - start)
+
+    def add_timing(self, name: str, seconds: float):
+        with self._lock:
+            self.timings.setdefault(name, []).append(seconds)
+
+    def observe(self, name: str, value: float):
+        """Record a non-time sample, e.g. WebDriver commands for one listing"""
+        with self._lock:
+            self.values.setdefault(name, []).append(value)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> Dict:
+        """Machine-readable summary of the run"""
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'wall_seconds': time.perf_counter() - self._start,
+                'phases': {name: distribution(samples) for name, samples in sorted(self.timings.items())},
+                'values': {name: distribution(samples) for name, samples in sorted(self.values.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def save(self, path: Path = PROFILE_FILE) -> Dict:
+        """Append the summary to the profile file and return it"""
+        summary = self.summary()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary) + '\n')
+        return summary
+
+    def print_summary(self):
+        """Short table of the slowest phases"""
+        summary = self.summary()
+        print(f"\nRun profile ({summary['wall_seconds']:.1f} s):")
+        phases = sorted(summary['phases'].items(), key=lambda item: item[1]['total'], reverse=True)
+        for name, stats in phases:
+            print(f"  {name:<28} {stats['count']:>6} x  p50 {stats['p50']:>7.3f} s  "
+                  f"p95 {stats['p95']:>7.3f} s  total {stats['total']:>8.1f} s")
+        for name, stats in summary['values'].items():
+            print(f"  {name:<28} p50 {stats['p50']:>7.1f}  p95 {stats['p95']:>7.1f}")
+        for name, value in summary['counters'].items():
+            print(f"  {name:<28} {value:>6}")
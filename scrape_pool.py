@@ -0,0 +1,124 @@
+"""
+Concurrent scraping of ad pages with a bounded pool of WebDriver workers
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from rate_control import RateLimiter, classify_result
+
+
+class ScraperPool:
+    def __init__(self, scraper_factory: Callable, workers: int = 4,
+                 rate_limiter: Optional[RateLimiter] = None, retries: int = 1):
+        """
+        Pool of scrapers, one per worker thread
+        scraper_factory: Callable returning a new scraper (e.g. FinnPropertyScraperSelenium)
+        workers: Number of browser instances running at the same time
+        rate_limiter: Shared limiter for all workers (defaults to one request per second)
+        retries: Number of extra attempts per listing if scraping fails (blocked pages are not retried)
+        """
+        self.scraper_factory = scraper_factory
+        self.workers = workers
+        self.rate_limiter = rate_limiter or RateLimiter(1.0)
+        self.retries = retries
+        self._local = threading.local()
+        self._scrapers = []
+        self._scrapers_lock = threading.Lock()
+
+    def _get_scraper(self):
+        """Return this worker's scraper, starting a browser on first use"""
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is None:
+            scraper = self.scraper_factory()
+            self._local.scraper = scraper
+            with self._scrapers_lock:
+                self._scrapers.append(scraper)
+        return scraper
+
+    def _drop_scraper(self):
+        """Close this worker's scraper so the next attempt gets a fresh browser"""
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is None:
+            return
+        self._local.scraper = None
+        with self._scrapers_lock:
+            self._scrapers.remove(scraper)
+        try:
+            scraper.close()
+        except Exception:
+            pass
+
+    def _scrape(self, url: str) -> Dict:
+        """Scrape one listing in a worker thread, retrying on errors other than blocks"""
+        data = None
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+            try:
+                data = self._get_scraper().scrape_property(url)
+            except Exception as e:
+                # Browser died or could not start; replace it before retrying
+                self._drop_scraper()
+                data = {'url': url, 'error': str(e)}
+                continue
+            if 'error' not in data:
+                break
+            if classify_result(data) == 'blocked':
+                # Asking again right away only prolongs the block (the adaptive rate controller backs off on it)
+                break
+            if attempt < self.retries:
+                print(f"  Retrying {url} ({data['error']})")
+        return data
+
+    def scrape(self, cards: Iterable[Dict],
+               lookup: Optional[Callable[[Dict], Optional[Dict]]] = None) -> Iterator[Tuple[Dict, Dict]]:
+        """
+        Scrape listings concurrently and yield (card, data) in input order.
+        cards: Search result cards (dicts with at least 'url')
+        lookup: Returns already known data for a card (e.g. from a cache), skipping its ad page
+        Only a few listings are scheduled ahead of the consumer, so stopping
+        the iteration early (e.g. over budget) cancels the rest.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        cards = iter(cards)
+
+        def schedule(card):
+            data = lookup(card) if lookup else None
+            if data is not None:
+                future = Future()
+                future.set_result(data)
+            else:
+                future = executor.submit(self._scrape, card['url'])
+            pending.append((card, future))
+
+        try:
+            for card in cards:
+                schedule(card)
+                if len(pending) >= self.workers * 2:
+                    break
+
+            while pending:
+                card, future = pending.popleft()
+                data = future.result()
+                next_card = next(cards, None)
+                if next_card is not None:
+                    schedule(next_card)
+                yield card, data
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            self.close()
+
+    def close(self):
+        """Close all browsers started by the pool"""
+        with self._scrapers_lock:
+            scrapers, self._scrapers = self._scrapers, []
+        for scraper in scrapers:
+            try:
+                scraper.close()
+            except Exception:
+                pass
@@ -0,0 +1,300 @@
+"""
+Watch mode: re-scan the search on a schedule and report changes
+Each cycle reads the search result cards, diffs them against the previous scan
+and only opens ad pages for new listings and listings whose card price changed.
+Emits 'new', 'price_drop', 'price_increase' and 'delisted' events (printed and
+appended to watch_events.jsonl). One browser / HTTP session is reused for all
+cycles, and memory only holds the current search's cards and the current cycle's
+run profile (each cycle's profile is appended to finn_profile.jsonl).
+
+Usage: python watch.py   (settings from my_config.py, see README; Ctrl+C to stop)
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from finn_extract import card_skip_reason
+from loan_calculator import EXAMPLE_LOAN_PARAMS, calculate_loan_for_listing
+from rate_control import RateLimiter
+from run_profile import PROFILE_FILE, RunProfile
+
+# Last scan's cards, so a restarted watcher does not report everything as new
+WATCH_STATE_FILE = Path(__file__).parent / "watch_state.json"
+# One event per line
+WATCH_EVENTS_FILE = Path(__file__).parent / "watch_events.jsonl"
+
+# A listing must be missing from this many scans in a row before it counts as delisted
+# (a search page that failed to load would otherwise delist everything on it)
+DELISTED_AFTER_SCANS = 2
+
+
+class ListingWatcher:
+    def __init__(self, scraper_factory: Callable, search_url: str, max_price: int = None,
+                 loan_params: dict = None, min_bedrooms: int = None, engine: str = 'selenium',
+                 min_interval: float = 1.0, state_path: Path = WATCH_STATE_FILE,
+                 events_path: Path = WATCH_EVENTS_FILE, on_event: Callable[[Dict], None] = None,
+                 profile_path: Path = PROFILE_FILE):
+        """
+        scraper_factory: Creates the FinnPropertyScraperSelenium used for search pages (and ad pages)
+        engine: 'http' fetches ad pages with requests and falls back to the browser
+        min_interval: Minimum seconds between ad page requests (unless the scraper has a rate_controller)
+        on_event: Called with every event dict
+        profile_path: Where each cycle's run profile is appended
+        """
+        self.scraper_factory = scraper_factory
+        self.search_url = search_url
+        self.max_price = max_price
+        self.loan_params = loan_params
+        self.min_bedrooms = min_bedrooms
+        self.engine = engine
+        self.rate_limiter = RateLimiter(min_interval)
+        self.state_path = Path(state_path)
+        self.events_path = Path(events_path)
+        self.on_event = on_event
+        self.profile_path = Path(profile_path)
+
+        self.scraper = None
+        self.ad_scraper = None
+        # finnkode -> {'url', 'card_price', 'missing'} for the listings we track: those that
+        # passed the card filters (max_price, min_bedrooms) in the last scan
+        self.known: Dict[str, Dict] = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            print(f"Ignoring unreadable watch state {self.state_path}")
+            return {}
+
+    def _save_state(self):
+        """Atomically write the known listings to file"""
+        tmp_path = self.state_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.known, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def _open(self):
+        """Start the browser (and HTTP session) once; they are reused by later cycles"""
+        if self.scraper is None:
+            self.scraper = self.scraper_factory()
+            if self.scraper.rate_controller is not None:
+                self.rate_limiter = self.scraper.rate_controller
+            if self.engine == 'http':
+                from finn_scraper_http import FinnPropertyScraperHTTP
+                self.ad_scraper = FinnPropertyScraperHTTP(fallback=self.scraper, profile=self.scraper.profile,
+                                                          rate_controller=self.scraper.rate_controller)
+            else:
+                self.ad_scraper = self.scraper
+
+    def _save_profile(self):
+        """Append this cycle's run profile and start a fresh one, so memory stays bounded however long we watch"""
+        if self.scraper is None:
+            return
+        self.scraper.profile.save(self.profile_path)
+        profile = RunProfile()
+        self.scraper.profile = profile
+        if self.ad_scraper is not None and self.ad_scraper is not self.scraper:
+            self.ad_scraper.profile = profile
+
+    def close(self):
+        if self.ad_scraper is not None and self.ad_scraper is not self.scraper:
+            self.ad_scraper.close()
+        if self.scraper is not None:
+            self.scraper.close()
+        self.scraper = None
+        self.ad_scraper = None
+
+    def _emit(self, event_type: str, card: Dict, data: Dict = None, previous_card_price: int = None):
+        event = {
+            'type': event_type,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'finnkode': card['finnkode'],
+            'url': card['url'],
+            'card_price': card.get('card_price'),
+            'previous_card_price': previous_card_price,
+        }
+        if data is not None:
+            event['totalpris'] = data.get('totalpris_inkl_fellesgjeld')
+            event['price_change'] = data.get('price_change')
+            loan = calculate_loan_for_listing(data, self.loan_params) if self.loan_params else None
+            event['net_monthly_cost'] = loan['net_monthly_cost'] if loan else None
+
+        price = event.get('totalpris') or event['card_price']
+        print(f"[{event['time']}] {event_type.upper()}: {event['finnkode']} "
+              f"{f'{price:,} kr' if price else ''} {event['url']}")
+        with open(self.events_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _fetch(self, card: Dict) -> Dict:
+        self.rate_limiter.wait()
+        print(f"Scraping {card['url']}")
+        return self.ad_scraper.scrape_property(card['url'])
+
+    def scan(self) -> int:
+        """Run one cycle; returns the number of events"""
+        self._open()
+        cards = {}
+        for card in self.scraper.iter_property_listings(search_url=self.search_url, max_price=self.max_price):
+            cards[card['finnkode']] = card
+        complete = self.scraper.search_complete
+
+        if not cards and self.known:
+            print("Search returned no listings - skipping this cycle")
+            return 0
+        if not complete:
+            print("Search ended early - listings not seen this time are not counted as missing")
+
+        # Only listings that pass the card filters are tracked. Over-budget cards from the last
+        # search page would drop off the crawl as cheaper listings arrive and look delisted.
+        tracked = {finnkode: card for finnkode, card in cards.items()
+                   if card_skip_reason(card, max_price=self.max_price, min_bedrooms=self.min_bedrooms) is None}
+
+        first_scan = not self.known
+        changed = [card for finnkode, card in cards.items()
+                   if (finnkode in tracked and finnkode not in self.known)
+                   or (finnkode in self.known and self.known[finnkode]['card_price'] != card['card_price'])]
+        failed = set()
+
+        events = 0
+        for card in changed:
+            previous = self.known.get(card['finnkode'])
+            if card['finnkode'] not in tracked:
+                # A tracked listing filtered out by its new card price; report the change, then stop tracking it
+                if card['card_price'] and previous['card_price']:
+                    self._emit('price_drop' if card['card_price'] < previous['card_price'] else 'price_increase',
+                               card, previous_card_price=previous['card_price'])
+                    events += 1
+                continue
+
+            data = self._fetch(card)
+            if data.get('error'):
+                # Try again next cycle
+                failed.add(card['finnkode'])
+                continue
+            if previous is None:
+                if not first_scan:
+                    self._emit('new', card, data)
+                    events += 1
+            else:
+                change = data.get('price_change')
+                if not change and card['card_price'] and previous['card_price']:
+                    change = card['card_price'] - previous['card_price']
+                if change:
+                    self._emit('price_drop' if change < 0 else 'price_increase', card, data, previous['card_price'])
+                    events += 1
+
+        # Listings missing from this scan (still listed but filtered out: no longer tracked)
+        known = {}
+        for finnkode, previous in self.known.items():
+            if finnkode in cards:
+                continue
+            if not complete:
+                # The crawl did not get through the search, so absence means nothing
+                known[finnkode] = previous
+                continue
+            missing = previous.get('missing', 0) + 1
+            if missing >= DELISTED_AFTER_SCANS:
+                self._emit('delisted', {'finnkode': finnkode, 'url': previous['url'],
+                                        'card_price': previous['card_price']})
+                events += 1
+            else:
+                known[finnkode] = {**previous, 'missing': missing}
+
+        for finnkode, card in tracked.items():
+            if finnkode in failed:
+                # Keep the old card price so the ad is fetched again; new listings stay new
+                if finnkode in self.known:
+                    known[finnkode] = {**self.known[finnkode], 'missing': 0}
+                continue
+            known[finnkode] = {'url': card['url'], 'card_price': card['card_price'], 'missing': 0}
+        self.known = known
+        self._save_state()
+
+        if first_scan:
+            print(f"First scan: now watching {len(tracked)} listings")
+        return events
+
+    def run(self, interval_minutes: float = 15, max_cycles: Optional[int] = None):
+        """Scan every interval_minutes until interrupted (or max_cycles scans)"""
+        cycle = 0
+        try:
+            while max_cycles is None or cycle < max_cycles:
+                cycle += 1
+                start = time.monotonic()
+                print(f"\n=== Scan {cycle} ({datetime.now():%Y-%m-%d %H:%M}) ===")
+                try:
+                    events = self.scan()
+                    print(f"{events} changes, watching {len(self.known)} listings")
+                except Exception as e:
+                    # Start a fresh browser next cycle
+                    print(f"Scan failed: {e}")
+                    self._save_profile()
+                    self.close()
+                else:
+                    self._save_profile()
+
+                if max_cycles is not None and cycle >= max_cycles:
+                    break
+                time.sleep(max(0.0, interval_minutes * 60 - (time.monotonic() - start)))
+        except KeyboardInterrupt:
+            print("\nStopping watch")
+        finally:
+            self.close()
+
+
+def main():
+    from finn_scraper_selenium import (FinnPropertyScraperSelenium, _adaptive_rate_controller, _budget_max_price,
+                                       _config_value)
+
+    try:
+        from my_config import SEARCH_URL, LOAN_PARAMS, MAX_PRICE
+    except ImportError:
+        print("my_config.py not found - create it with SEARCH_URL, LOAN_PARAMS and MAX_PRICE (see README)")
+        return
+
+    loan_params = LOAN_PARAMS or EXAMPLE_LOAN_PARAMS
+    max_price = MAX_PRICE
+    monthly_budget = _config_value('MONTHLY_BUDGET', None)
+    if monthly_budget is not None:
+        try:
+            max_price = _budget_max_price(max_price, loan_params, monthly_budget)
+        except ValueError as e:
+            print(e)
+            return
+
+    # Created once, so the rate it has found survives browser restarts
+    rate_controller = _adaptive_rate_controller()
+
+    def scraper_factory():
+        return FinnPropertyScraperSelenium(
+            headless=True,
+            debugger_address=_config_value('CHROME_DEBUGGER_ADDRESS', None),
+            block_resources=_config_value('BLOCK_RESOURCES', True),
+            block_css=_config_value('BLOCK_CSS', False),
+            rate_controller=rate_controller,
+            recycle_after_pages=_config_value('RECYCLE_AFTER_PAGES', 300),
+            recycle_above_mb=_config_value('RECYCLE_ABOVE_MB', 1500),
+        )
+
+    watcher = ListingWatcher(
+        scraper_factory,
+        search_url=SEARCH_URL,
+        max_price=max_price,
+        loan_params=loan_params,
+        min_bedrooms=_config_value('MIN_BEDROOMS', None),
+        engine=_config_value('ENGINE', 'selenium'),
+    )
+    watcher.run(interval_minutes=_config_value('WATCH_INTERVAL_MINUTES', 15))
+
+
+if __name__ == "__main__":
+    main()